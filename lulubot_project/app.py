@@ -1,47 +1,157 @@
 # app.py (no-h5, uses emotions.py) — routes_emotion.py 기능 통합판
-import os, time, threading, pickle, traceback
+import os, time, json, threading, tempfile, traceback, multiprocessing
+from contextlib import nullcontext
 from collections import deque
 from flask import Flask, Response, jsonify, request, send_from_directory
 import cv2
 import numpy as np
-import face_recognition  # 설치되어 있으면 사용 (없으면 아래 주석 참고)
-from emotions import HeuristicEmotion, FerEmotion, EMOTIONS  # EMOTIONS 미사용해도 무방
+from emotions import load_engine, EMOTIONS  # EMOTIONS 미사용해도 무방
+from pipeline import CameraPipeline, default_workers, get_pool, detect_job, warm_pool
+from gallery import IVF_MIN_SIZE
+from gallerystore import GalleryStore
+from stream import StreamBroadcaster
+from tracker import FaceTracker
+from scheduler import DetectScheduler
+from timeseries import EmotionStore
+from framering import FrameRing
+from sources import open_source, SyntheticSource
+from overlay import draw_faces
+from enroll import EnrollManager
+from batch import BatchManager
+import metrics
 
 app = Flask(__name__)
 
 # ---------- 설정 ----------
+DEBUG = True        # Flask 개발 서버 debug/리로더 (python app.py로 실행할 때)
 MIRROR = True       # 셀카 모드(좌우반전) 출력 여부
+CAMERA_SOURCE = os.environ.get("LULU_SOURCE", "0")  # 웹캠 번호 | 동영상 파일 | 이미지 폴더 | synthetic:640x480:2
+SOURCE_FPS = float(os.environ.get("LULU_SOURCE_FPS", "30"))  # 웹캠 외 소스의 재생 속도
 FACE_THRESH = 0.50  # 얼굴 매칭 임계값(낮을수록 엄격)
-DETECT_EVERY_N = 5  # N프레임마다 얼굴/감정 수행(부하 감소)
+DETECT_EVERY_N = 5  # N프레임마다 얼굴/감정 수행(부하 감소) — 적응형이면 초기값
 JPEG_QUALITY = 80
+THUMB_WIDTH = 320    # ?r=thumb 렌디션 가로 크기
+THUMB_QUALITY = 60
+EMOTION_ENGINE = os.environ.get("LULU_EMOTION_ENGINE", "heuristic")  # heuristic | onnx | tflite
+EMOTION_MODEL = os.environ.get("LULU_EMOTION_MODEL", "")
+EMOTION_LABELS = os.environ.get("LULU_EMOTION_LABELS", "")  # 모델 출력 라벨 순서(쉼표 구분), 기본 FER2013 순서
+EMOTION_INPUT_SCALE = float(os.environ.get("LULU_EMOTION_INPUT_SCALE", "1.0"))  # 0~255 입력 모델이면 255
+GALLERY_MODE = os.environ.get("LULU_GALLERY_MODE", "auto")  # flat | ivf | auto
+DETECT_SCALE = 0.25  # 검출용 축소 비율 — 적응형이면 초기값
+ADAPTIVE_DETECT = True      # 측정된 단계 시간으로 주기/축소 비율 자동 조정
+DETECT_LATENCY_MS = 150.0   # 전체 프레임 검출 1회 지연 예산
+DETECT_CPU_BUDGET = 0.75    # 검출 워커 점유율 상한
+FULL_SWEEP_SEC = 1.0        # 얼굴 주변 ROI만 검색하다가 이 주기로 전체 프레임 검색
+EVENTS_KEEPALIVE_SEC = 15.0  # /api/events 무변경 시 keepalive 주기
+TRACK_FLOW = False   # 비검출 프레임에서 optical flow로 박스 이동
+TRACK_ALPHA = 0.5    # 트랙별 감정 EMA 계수
+REENCODE_SEC = 2.0   # 신원 확정 트랙도 이 주기마다 재인코딩(검증)
+DETECT_WORKERS = int(os.environ.get("LULU_DETECT_WORKERS", 0)) or default_workers()  # 검출 프로세스 수
 
 # ---------- 경로/스토리지 ----------
 DATA_DIR = os.path.join(os.getcwd(), "data")
 os.makedirs(DATA_DIR, exist_ok=True)
-DB_PATH = os.path.join(DATA_DIR, "faces_db.pkl")
-
-known_encodings = []  # [{name:str, encoding:np.ndarray}]
-if os.path.exists(DB_PATH):
-    with open(DB_PATH, "rb") as f:
-        try:
-            known_encodings = pickle.load(f)
-        except Exception:
-            known_encodings = []
+DB_PATH = os.path.join(DATA_DIR, "faces_db.pkl")   # 이전 포맷(가져오기 전용)
+GALLERY_DIR = os.path.join(DATA_DIR, "gallery")
+HIST_PATH = os.path.join(DATA_DIR, "emotion_hist.bin")
+HIST_CAPACITY = 262144  # 약 11.5MB — 검출마다 얼굴별 1행, 검출 주기가 매 프레임(30fps)까지 내려가면 얼굴 1명 기준 약 2.4시간
+
+# ---------- 백그라운드 초기화 ----------
+# import는 설정/라우트만 만들고 바로 요청을 받는다. init()(모듈 끝에서 호출)이 갤러리(변경 로그 + 메모리 맵 스냅샷,
+# 기존 faces_db.pkl은 처음 한 번 가져온 뒤 그대로 둠)·감정 엔진·검출 워커를 별도 스레드에서 올리고
+# 합성 프레임으로 한 번씩 예열해서 첫 실제 요청이 모델 로딩/초기화 비용을 내지 않게 한다.
+# /healthz는 프로세스가 살아 있으면 200, /readyz는 세 구성요소가 모두 준비되면 200.
+WARMUP = os.environ.get("LULU_WARMUP", "1") != "0"
+STARTED_AT = time.time()
+gallery_store = None
+gallery = None       # FaceGallery — 준비 전에는 None
+enroller = None      # 일괄/다중 샘플 등록 작업 (검출 워커 풀을 라이브 카메라와 나눠 씀)
+batcher = None       # 녹화 영상 일괄 분석 작업 (같은 풀을 청크 단위로 나눠 씀)
+predictor = None
+ENGINE_NOTE = None
+ENGINE_NAME = EMOTION_ENGINE
+readiness = {name: {"ready": False, "sec": None, "error": None} for name in ("gallery", "engine", "detector")}
+ready_event = threading.Event()
 
 def save_db():
-    with open(DB_PATH, "wb") as f:
-        pickle.dump(known_encodings, f)
-
-# ---------- 감정 엔진 ----------
-# fer/mtcnn이 깔려 있으면 FerEmotion.ok=True로 동작, 아니면 자동 폴백(휴리스틱)
-try:
-    predictor = FerEmotion(alpha=0.50, conf_th=0.40, min_rel=0.12)
-    ENGINE_NAME = "fer" if getattr(predictor, "ok", False) else "heuristic"
-    if ENGINE_NAME == "heuristic":
-        predictor = HeuristicEmotion()
-except Exception:
-    predictor = HeuristicEmotion()
-    ENGINE_NAME = "heuristic"
+    """변경 레코드는 갤러리가 이미 로그에 남김 → 디스크에 내리고(fsync) 로그가 길면 압축"""
+    gallery_store.sync()
+
+def _init_gallery():
+    global gallery_store, gallery, enroller, batcher
+    store = GalleryStore(GALLERY_DIR)
+    if not store.exists() and os.path.exists(DB_PATH):
+        g = store.import_pickle(DB_PATH, mode=GALLERY_MODE)
+    else:
+        g = store.load(mode=GALLERY_MODE)
+    if g.mode == "ivf" or (g.mode == "auto" and len(g) >= IVF_MIN_SIZE):
+        g.build_index()   # 분할 학습까지 끝나야 gallery 준비 완료 (검색 중 백그라운드 학습은 이후 증가분만)
+    if WARMUP and len(g):
+        g.match(np.zeros((1, g.dim), dtype=np.float32), FACE_THRESH)  # 페이지 적재
+    gallery_store, gallery = store, g
+    enroller = EnrollManager(gallery, on_commit=save_db, workers=DETECT_WORKERS)
+    engine = {"name": EMOTION_ENGINE, "model_path": EMOTION_MODEL, "labels": EMOTION_LABELS or None,
+              "input_scale": EMOTION_INPUT_SCALE}
+    batcher = BatchManager(gallery, engine=engine, workers=DETECT_WORKERS,
+                           out_root=os.path.join(DATA_DIR, "batch"), thresh=FACE_THRESH)
+
+def _init_engine():
+    # LULU_EMOTION_ENGINE=onnx|tflite + LULU_EMOTION_MODEL=모델 경로면 CPU 분류 모델 사용,
+    # 런타임/모델 파일이 없으면 휴리스틱으로 폴백(사유는 state["last_error"]에 기록)
+    global predictor, ENGINE_NOTE, ENGINE_NAME
+    engine, note = load_engine(
+        EMOTION_ENGINE,
+        model_path=EMOTION_MODEL,
+        labels=EMOTION_LABELS or None,
+        input_scale=EMOTION_INPUT_SCALE,
+    )
+    if WARMUP:
+        engine.predict_batch([_warm_frame()])   # 세션/텐서 할당을 미리
+    predictor, ENGINE_NOTE, ENGINE_NAME = engine, note, engine.name
+
+def _init_detector():
+    if WARMUP:
+        warm_pool(DETECT_WORKERS, cv2.cvtColor(_warm_frame(), cv2.COLOR_BGR2RGB))
+
+def _warm_frame():
+    return SyntheticSource(320, 240, faces=1, seed=1).read()[1]
+
+def _init_component(name, fn):
+    t0 = time.time()
+    try:
+        fn()
+        readiness[name]["ready"] = True
+    except Exception as e:
+        traceback.print_exc()
+        readiness[name]["error"] = f"{type(e).__name__}: {e}"
+    readiness[name]["sec"] = round(time.time() - t0, 3)
+    if all(r["ready"] for r in readiness.values()):
+        ready_event.set()
+
+_init_started = False
+
+def init():
+    """
+    구성요소 초기화 스레드 시작(한 번만). 모듈 끝에서 import 시 자동으로 불린다 —
+    python app.py, flask --app app run, gunicorn/waitress 등 어떻게 띄우든 같다. 단,
+      - spawn 방식(Windows/macOS) 검출 워커는 이 모듈을 __mp_main__으로 다시 실행하므로 건너뜀
+        (안 그러면 워커가 또 워커 풀을 띄움), 그 밖의 자식 프로세스도 마찬가지
+      - python app.py + 리로더의 부모 프로세스는 파일 감시만 하므로 건너뜀(실제 서버는 자식)
+    """
+    global _init_started
+    if _init_started or __name__ == "__mp_main__" or multiprocessing.parent_process() is not None:
+        return
+    if __name__ == "__main__" and DEBUG and os.environ.get("WERKZEUG_RUN_MAIN") != "true":
+        return
+    _init_started = True
+    for name, fn in (("detector", _init_detector), ("gallery", _init_gallery), ("engine", _init_engine)):
+        threading.Thread(target=_init_component, args=(name, fn), name=f"init-{name}", daemon=True).start()
+
+def _not_ready():
+    return jsonify({"ok": False, "msg": "starting up", "components": readiness}), 503
+
+def _known_count():
+    return len(gallery) if gallery is not None else 0
 
 def _complete7(d: dict) -> dict:
     """항상 7키를 가지도록 보정 + 정규화"""
@@ -57,247 +167,416 @@ def _complete7(d: dict) -> dict:
         return {k: (1.0 if k == "neutral" else 0.0) for k in ALL7}
     return {k: (out[k] / s) for k in ALL7}
 
-# ---------- 런타임 상태 ----------
-cap = None
-cam_lock = threading.Lock()
-running = False
-latest_frame = None        # 마지막 원본 프레임 (등록/인식에 사용, 미러링 안 함)
-annotated_frame = None     # 화면 송출용 프레임 (오버레이 + 필요 시 미러링)
-
-# 추가: 감정 히스토리/FPS 관리
-HIST_MAX = 200
-emotion_hist = deque(maxlen=HIST_MAX)
-fps_ma = deque(maxlen=30)
-last_time = time.time()
+# ---------- 카메라 ----------
+# LULU_CAMERAS="front=0,back=1,demo=synthetic:640x480:2" 처럼 여러 소스를 한 프로세스에서 동시에 운용.
+# 갤러리/감정 엔진/검출 워커 풀은 모든 카메라가 공유하고, 카메라별로 트랙·스트림·히스토리·상태를 따로 둔다.
+CAMERAS_SPEC = os.environ.get("LULU_CAMERAS", "")
+RENDITIONS = {
+    "main": {"width": None, "quality": JPEG_QUALITY},
+    "thumb": {"width": THUMB_WIDTH, "quality": THUMB_QUALITY},
+}
+HIST_MAX = 200      # /api/history 기본 반환 행 수
+HIST_LIMIT_MAX = 5000  # /api/history limit 상한 (넓은 구간은 bucket으로 다운샘플링)
 
 def _now_ms():
     return int(time.time() * 1000)
 
-state = {
-    "faces": 0,
-    "last_emotion": None,
-    "last_conf": 0.0,
-    "last_probs": None,   # 추가: 마지막 7클래스 확률 분포
-    "last_names": [],
-    "last_error": None,
-    "tick": 0,
-    "engine": ENGINE_NAME,
-    "last_ts": time.time(),  # 마지막 갱신 시각
-}
-
-def _overlay_status(base_frame, text_lines, org=(12, 28)):
-    x, y = org
-    for i, line in enumerate(text_lines):
-        yy = y + i * 24
-        cv2.putText(base_frame, line, (x, yy), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 4, cv2.LINE_AA)
-        cv2.putText(base_frame, line, (x, yy), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2, cv2.LINE_AA)
-
-def camera_loop():
-    global cap, running, latest_frame, annotated_frame, state, last_time
-    i = 0
-    try:
-        while running and cap and cap.isOpened():
-            ok, frame = cap.read()
-            if not ok:
-                state["last_error"] = "camera read fail"
-                time.sleep(0.02)
+def _parse_cameras(spec):
+    """"id=source,..." → [(id, source)] — id를 생략하면 cam0, cam1, ... (비어 있으면 CAMERA_SOURCE 하나)"""
+    cams = []
+    for i, item in enumerate(s.strip() for s in spec.split(",") if s.strip()):
+        cid, sep, source = item.partition("=")
+        cams.append((cid.strip(), source.strip()) if sep else (f"cam{i}", item))
+    return cams or [("cam0", CAMERA_SOURCE)]
+
+
+class Camera:
+    """카메라 1대의 런타임 상태 + 파이프라인 콜백"""
+    def __init__(self, cam_id, source, hist_path):
+        self.id = cam_id
+        self.source = source
+        self.cap = None
+        self.pipe = None                 # CameraPipeline (capture/detect/render 스레드)
+        self.lock = threading.Lock()
+        self.running = False
+        self.out_ring = FrameRing(len(RENDITIONS) + 4)  # 송출용 프레임(오버레이 + 미러링) 버퍼 — 브로드캐스터가 참조
+        self._draw = None                # 미러링 전 오버레이 작업 버퍼(렌더 스레드 전용, 재사용)
+        self.tracker = FaceTracker(alpha=TRACK_ALPHA, reencode_sec=REENCODE_SEC, use_flow=TRACK_FLOW)
+        self.broadcaster = StreamBroadcaster(RENDITIONS)
+        self.hist = EmotionStore(hist_path, capacity=HIST_CAPACITY)  # 디스크 메모리 맵 링 버퍼
+        self.fps_ma = deque(maxlen=30)
+        self.last_time = time.time()
+        self.state = {
+            "faces": 0,
+            "last_emotion": None,
+            "last_conf": 0.0,
+            "last_probs": None,   # 마지막 7클래스 확률 분포
+            "last_names": [],
+            "last_error": None,
+            "tick": 0,
+            "engine": ENGINE_NAME,
+            "last_ts": time.time(),  # 마지막 갱신 시각
+        }
+        # tick이 바뀔 때마다 깨워서 /api/events(SSE) 구독자에게 변경분을 보냄
+        self.state_cv = threading.Condition()
+
+    def bump(self):
+        with self.state_cv:
+            self.state["tick"] += 1
+            self.state_cv.notify_all()
+
+    # ---------- 시작/정지 ----------
+    def start(self):
+        """반환: 오류 메시지 or None"""
+        with self.lock:
+            if self.running:
+                return None
+            self.state["engine"] = ENGINE_NAME
+            if ENGINE_NOTE:
+                self.state["last_error"] = ENGINE_NOTE
+            self.cap = open_source(self.source, fps=SOURCE_FPS)
+            if not self.cap.isOpened():
+                self.state["last_error"] = "camera open failed"
+                return "camera open failed"
+            # 초기화
+            self.last_time = time.time()
+            self.fps_ma.clear()
+            self.tracker.reset()
+            self.running = True
+            scheduler = DetectScheduler(
+                every_n=DETECT_EVERY_N, scale=DETECT_SCALE, adaptive=ADAPTIVE_DETECT,
+                latency_budget_ms=DETECT_LATENCY_MS, cpu_budget=DETECT_CPU_BUDGET,
+                full_sweep_sec=FULL_SWEEP_SEC,
+            )
+            # on_stop은 이 파이프라인에 묶음 — stop() 직후 start()했을 때 이전 파이프라인의 늦은 종료 통지가
+            # 새 세션을 멈춘 것으로 처리하지 않도록
+            pipe = CameraPipeline(
+                self.cap, self._detect_result, self._render_frame,
+                on_error=self._pipeline_error, on_stop=lambda: self._pipeline_stopped(pipe),
+                skip_boxes=lambda: self.tracker.confident_boxes(gallery.version),
+                known_boxes=self.tracker.boxes,
+                scheduler=scheduler, workers=DETECT_WORKERS,
+            )
+            self.pipe = pipe
+            pipe.start()
+        self.bump()
+        return None
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+            if self.pipe:
+                self.pipe.stop()
+        self.bump()
+
+    # ---------- 파이프라인 콜백 ----------
+    def _detect_result(self, frame, boxes, encs):
+        """검출 단계 콜백: 트랙 연계 + 이름 매칭 + 감정 예측 (boxes는 원본 좌표)"""
+        now = time.time()
+        tracks = self.tracker.update(boxes, now)
+
+        # 이름 매칭: 인코딩된 얼굴(새/미확정 트랙)만 한 번의 배치 거리 계산으로
+        todo = [i for i, e in enumerate(encs) if e is not None]
+        if todo:
+            with metrics.stage("match"):
+                matches = gallery.match([encs[i] for i in todo], FACE_THRESH)
+            for i, (name, _) in zip(todo, matches):
+                tracks[i].bind(name, gallery.version, now)
+
+        # 감정 예측: 프레임의 모든 얼굴을 한 번의 배치 추론으로 (트랙별로 평활화, 요약은 첫 얼굴 기준)
+        rois = [frame[max(0, t): b, max(0, l): r] for (t, r, b, l) in boxes]
+        with metrics.stage("emotion"):
+            emotions_per_face = [_complete7(p) for p in predictor.predict_batch(rois)]
+        for tr, probs in zip(tracks, emotions_per_face):
+            tr.observe(probs, TRACK_ALPHA)
+        probs0 = emotions_per_face[0] if emotions_per_face else None
+
+        # FPS 계산(최근 감정 업데이트 주기 기준)
+        dt = now - self.last_time
+        self.last_time = now
+        if dt > 0:
+            self.fps_ma.append(1.0 / dt)
+
+        # 상태 업데이트(폴링/디버깅용) — 검출이 잠깐 빠져도 살아있는 트랙 기준
+        state = self.state
+        faces = self.tracker.snapshot()
+        top_label, top_conf = (faces[0][2], faces[0][3]) if faces else (None, 0.0)
+        state["faces"] = len(faces)
+        state["last_names"] = [f[1] for f in faces]
+        state["last_emotion"] = top_label
+        state["last_conf"] = float(top_conf) if top_label else 0.0
+        state["last_probs"] = probs0 if probs0 is not None else state.get("last_probs")
+        state["last_ts"] = now
+        self.bump()
+
+        # 히스토리 저장(얼굴별 원본 확률 + 이름/트랙 id)
+        t_ms = _now_ms()
+        for tr, probs in zip(tracks, emotions_per_face):
+            self.hist.append(t_ms, probs, tr.name, tr.id)
+
+        return faces
+
+    def _render_frame(self, frame, result):
+        """렌더 단계 콜백: 최신 프레임에 트랙(박스/이름/평활 감정)을 합성 — 미리 잡아둔 버퍼에만 씀"""
+        self.tracker.propagate(frame)
+        faces = self.tracker.snapshot()
+        out = self.out_ring.acquire(frame.shape)
+        try:
+            with metrics.stage("overlay"):
+                if MIRROR:
+                    if self._draw is None or self._draw.shape != frame.shape:
+                        self._draw = np.empty_like(frame)
+                    draw = self._draw
+                else:
+                    draw = out.data
+                np.copyto(draw, frame)
+                draw_faces(draw, faces, ENGINE_NAME, len(gallery))
+
+            # 미러링은 최종 단계에서만 (송출 버퍼로 바로)
+            if MIRROR:
+                with metrics.stage("flip"):
+                    cv2.flip(draw, 1, dst=out.data)
+        except Exception:
+            out.release()   # 실패해도 슬롯은 링으로 돌려보냄
+            raise
+        self.broadcaster.publish(out)   # 참조는 브로드캐스터가 가져가서 다음 프레임 때 반납
+
+    def _pipeline_error(self, msg):
+        if self.state["last_error"] != msg:
+            self.state["last_error"] = msg
+            self.bump()
+
+    def _pipeline_stopped(self, pipe):
+        with self.lock:
+            if self.pipe is not pipe:
+                return   # 이미 새 파이프라인으로 다시 시작됨
+            self.running = False
+            self.broadcaster.close()
+        self.bump()
+
+    # ---------- 조회/송출 ----------
+    def hold_latest(self):
+        """with cam.hold_latest() as frame: — 마지막 원본 프레임(미러링 안 됨)을 복사 없이 붙잡음, 없으면 None"""
+        return self.pipe.hold_latest() if self.pipe else nullcontext()
+
+    def event_snapshot(self):
+        state = self.state
+        return {
+            "camera": "started" if self.running else "stopped",
+            "faces": state["faces"],
+            "names": state["last_names"],
+            "emotion": state["last_emotion"],
+            "conf": round(state["last_conf"], 4),
+            "error": state["last_error"],
+            "tick": state["tick"],
+        }
+
+    def gen_events(self):
+        """tick이 바뀔 때만 직전에 보낸 값과 달라진 필드만 push (첫 메시지는 전체)"""
+        sent = {}
+        tick = None
+        while True:
+            with self.state_cv:
+                self.state_cv.wait_for(lambda: self.state["tick"] != tick, timeout=EVENTS_KEEPALIVE_SEC)
+                tick = self.state["tick"]
+                snap = self.event_snapshot()
+            delta = {k: v for k, v in snap.items() if k not in sent or sent[k] != v}
+            if len(delta) <= 1 and "tick" in sent:  # tick 외에 바뀐 게 없음
+                yield ": keepalive\n\n"
                 continue
+            sent.update(delta)
+            yield f"id: {tick}\ndata: {json.dumps(delta, ensure_ascii=False)}\n\n"
 
-            latest_frame = frame.copy()
-            draw = frame.copy()
-            names = []
-            boxes = []
-            top_label = None
-            top_conf = 0.0
-            probs0 = None  # 첫 얼굴 확률(7)
-
-            # N프레임에 한 번만 무거운 작업 실행
-            if i % DETECT_EVERY_N == 0:
-                try:
-                    # face_recognition: 빠른 검출/인코딩을 위해 1/4 스케일
-                    small = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-                    rgb_small = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
-                    boxes = face_recognition.face_locations(rgb_small, model="hog")  # or "cnn"
-                    encs = face_recognition.face_encodings(rgb_small, boxes)
-
-                    # 이름 매칭
-                    for enc in encs:
-                        name = "Unknown"
-                        if known_encodings:
-                            db_encs = [e["encoding"] for e in known_encodings]
-                            dists = face_recognition.face_distance(db_encs, enc)
-                            j = int(np.argmin(dists))
-                            if dists[j] < FACE_THRESH:
-                                name = known_encodings[j]["name"]
-                        names.append(name)
-
-                    # 감정 예측 (모든 얼굴에 대해 가능, 요약은 첫 얼굴 기준)
-                    emotions_per_face = []
-                    for (top, right, bottom, left) in boxes:
-                        (t, r, b, l) = (top * 4, right * 4, bottom * 4, left * 4)
-                        face_roi = frame[max(0, t): b, max(0, l): r]
-                        if face_roi.size == 0:
-                            probs = {"neutral": 1.0}
-                        else:
-                            probs = predictor.predict(face_roi)  # dict(7) or dict 일부 → 보정
-                            probs = _complete7(probs)
-                        emotions_per_face.append(probs)
-
-                    # 요약(첫 얼굴 기준)
-                    if emotions_per_face:
-                        probs0 = emotions_per_face[0]
-                        top_label = max(probs0, key=probs0.get)
-                        top_conf = float(probs0[top_label])
-                    else:
-                        top_label, top_conf = None, 0.0
-
-                    # FPS 계산(최근 감정 업데이트 주기 기준)
-                    now = time.time()
-                    dt = now - last_time
-                    last_time = now
-                    if dt > 0:
-                        fps_ma.append(1.0 / dt)
-
-                except Exception as e:
-                    state["last_error"] = f"detect/predict error: {e}"
-                    boxes, names, top_label, top_conf, probs0 = [], [], None, 0.0, None
-
-            # 오버레이(얼굴 박스/라벨)
-            for (top, right, bottom, left), name in zip(boxes, names):
-                (t, r, b, l) = (top * 4, right * 4, bottom * 4, left * 4)
-                cv2.rectangle(draw, (l, t), (r, b), (0, 255, 0), 2)
-                lbl = name if name else "Unknown"
-                if top_label is not None:
-                    lbl = f"{lbl} | {top_label} {int(top_conf * 100)}%"
-                cv2.rectangle(draw, (l, b - 22), (r, b), (0, 255, 0), -1)
-                cv2.putText(draw, lbl, (l + 4, b - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1, cv2.LINE_AA)
-
-            # 상단 상태 텍스트
-            if len(boxes) == 0:
-                header = [f"얼굴 미검출 · 엔진:{ENGINE_NAME}"]
-                if len(known_encodings) == 0:
-                    header.append("등록자 없음 — 감정만 표시 모드")
-            else:
-                emo_txt = f"{top_label} ({int(top_conf * 100)}%)" if top_label else "분석중"
-                who_txt = names[0] if names else "Unknown"
-                header = [f"{who_txt} | {emo_txt}  ·  얼굴:{len(boxes)} · 엔진:{ENGINE_NAME}"]
-
-            _overlay_status(draw, header)
-
-            # 미러링은 최종 단계에서만
-            annotated_frame = cv2.flip(draw, 1) if MIRROR else draw
-
-            # 상태 업데이트(폴링/디버깅용)
-            state["faces"] = len(boxes)
-            state["last_names"] = names
-            state["last_emotion"] = top_label
-            state["last_conf"] = float(top_conf) if top_label else 0.0
-            state["last_probs"] = probs0 if probs0 is not None else state.get("last_probs")
-            state["tick"] += 1
-            state["last_ts"] = time.time()
-
-            # 히스토리 저장(첫 얼굴 기준으로만 기록)
-            if probs0 is not None:
-                emotion_hist.append({
-                    "t": _now_ms(),
-                    "probs": probs0,
-                    "engine": ENGINE_NAME,
-                })
-
-            i += 1
-            time.sleep(0.001)  # 너무 바쁘지 않게
-    except Exception as e:
-        state["last_error"] = f"camera_loop crashed: {e}"
-        traceback.print_exc()
-    finally:
-        if cap:
-            try:
-                cap.release()
-            except Exception:
-                pass
-        annotated_frame = None
-
-def gen_mjpeg():
-    global annotated_frame, latest_frame
-    while running:
-        frame = annotated_frame if annotated_frame is not None else latest_frame
-        if frame is None:
-            time.sleep(0.02)
-            continue
-        ret, jpg = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY])
-        if not ret:
-            continue
-        yield (b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpg.tobytes() + b"\r\n")
-        time.sleep(0.02)  # ~50fps
+    def etag(self):
+        return f"{self.state['tick']}-{int(self.running)}-{gallery.version if gallery is not None else 0}"
+
+    def gen_mjpeg(self, rendition="main"):
+        """공유 브로드캐스터에서 새 프레임이 생길 때마다 이미 인코딩된 JPEG를 받아 송출"""
+        clients = metrics.STREAM_CLIENTS.labels(rendition=rendition)
+        sent = metrics.STREAM_BYTES.labels(rendition=rendition)
+        clients.inc()
+        try:
+            seq = 0
+            while self.running:
+                seq, part = self.broadcaster.wait(rendition, seq, timeout=1.0)
+                if part is None:
+                    continue
+                yield part
+                sent.inc(len(part))
+        finally:
+            clients.dec()
+
+
+# 첫 카메라가 기본 카메라(id 없는 라우트 대상)이고 기존 히스토리 파일을 그대로 사용
+cameras = {}
+for _i, (_cid, _source) in enumerate(_parse_cameras(CAMERAS_SPEC)):
+    _hist = HIST_PATH if _i == 0 else os.path.join(DATA_DIR, f"emotion_hist_{_cid}.bin")
+    cameras[_cid] = Camera(_cid, _source, _hist)
+DEFAULT_CAMERA = next(iter(cameras))
+
+def _camera(cam_id=None):
+    return cameras.get(cam_id or DEFAULT_CAMERA)
+
+def _no_camera(cam_id):
+    return jsonify({"ok": False, "error": f"unknown camera: {cam_id}"}), 404
+
+def _etag_json(cam, build):
+    """tick 기반 ETag: 변경이 없으면 JSON을 만들지 않고 304"""
+    etag = cam.etag()
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = jsonify(build())
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
 # ---------- API ----------
+@app.route("/api/cameras")
+def list_cameras():
+    return jsonify({"default": DEFAULT_CAMERA, "cameras": [{
+        "id": cam.id,
+        "source": cam.source,
+        "camera": "started" if cam.running else "stopped",
+        "faces": cam.state["faces"],
+        "emotion": cam.state["last_emotion"],
+    } for cam in cameras.values()]})
+
 @app.route("/api/start_camera", methods=["GET", "POST"])
-def start_camera():
-    global cap, running, state, last_time
-    with cam_lock:
-        if running:
-            return jsonify({"status": "started"})
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            state["last_error"] = "camera open failed"
-            return jsonify({"status": "error", "msg": "camera open failed"}), 500
-        # 초기화
-        last_time = time.time()
-        fps_ma.clear()
-        running = True
-        threading.Thread(target=camera_loop, daemon=True).start()
+@app.route("/api/start_camera/<cam_id>", methods=["GET", "POST"])
+def start_camera(cam_id=None):
+    cam = _camera(cam_id)
+    if cam is None:
+        return _no_camera(cam_id)
+    if not ready_event.is_set():
+        return _not_ready()
+    err = cam.start()
+    if err:
+        return jsonify({"status": "error", "msg": err}), 500
     return jsonify({"status": "started"})
 
 @app.route("/api/stop_camera", methods=["GET", "POST"])
-def stop_camera():
-    global running
-    with cam_lock:
-        running = False
+@app.route("/api/stop_camera/<cam_id>", methods=["GET", "POST"])
+def stop_camera(cam_id=None):
+    cam = _camera(cam_id)
+    if cam is None:
+        return _no_camera(cam_id)
+    cam.stop()
     return jsonify({"status": "stopped"})
 
 @app.route("/api/camera_status")
-def camera_status():
-    return jsonify({"status": "started" if running else "stopped"})
+@app.route("/api/camera_status/<cam_id>")
+def camera_status(cam_id=None):
+    cam = _camera(cam_id)
+    if cam is None:
+        return _no_camera(cam_id)
+    return jsonify({"status": "started" if cam.running else "stopped"})
 
 @app.route("/video_feed")
-def video_feed():
-    if not running:
+@app.route("/video_feed/<cam_id>")
+def video_feed(cam_id=None):
+    """?r=thumb 로 저해상도 렌디션 선택 (기본 main)"""
+    cam = _camera(cam_id)
+    if cam is None:
+        return _no_camera(cam_id)
+    if not cam.running:
         return jsonify({"error": "camera not started"}), 409
-    return Response(gen_mjpeg(), mimetype="multipart/x-mixed-replace; boundary=frame")
+    rendition = request.args.get("r", "main")
+    if rendition not in cam.broadcaster.renditions:
+        return jsonify({"error": f"unknown rendition: {rendition}"}), 400
+    return Response(cam.gen_mjpeg(rendition), mimetype="multipart/x-mixed-replace; boundary=frame")
+
+@app.route("/api/events")
+@app.route("/api/events/<cam_id>")
+def events(cam_id=None):
+    """상태 변경분 push(Server-Sent Events) — 폴링 대신 구독"""
+    cam = _camera(cam_id)
+    if cam is None:
+        return _no_camera(cam_id)
+    return Response(cam.gen_events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/healthz")
+def healthz():
+    """프로세스 생존 확인 (초기화 여부와 무관)"""
+    return jsonify({"ok": True, "uptime": round(time.time() - STARTED_AT, 1)})
+
+@app.route("/readyz")
+def readyz():
+    """모델 로드 + 갤러리 색인 + 검출 워커 예열이 끝나야 200 — 그 전에는 503으로 트래픽을 받지 않게"""
+    ready = ready_event.is_set()
+    return jsonify({"ok": ready, "components": readiness}), 200 if ready else 503
+
+@app.route("/api/metrics")
+def api_metrics():
+    """Prometheus 텍스트 포맷: 단계별 지연 히스토그램, 프레임/스트림 카운터"""
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/api/profile", methods=["GET", "POST"])
+def api_profile():
+    """
+    샘플링 프로파일러 토글
+      POST { "enable": true, "interval_ms": 10 } → 시작 / { "enable": false } → 정지
+      GET → 지금까지 모은 collapsed stack (flamegraph 입력 형식)
+    """
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        if data.get("enable"):
+            metrics.PROFILER.start(float(data.get("interval_ms", 10)))
+        else:
+            metrics.PROFILER.stop()
+        return jsonify({"ok": True, "running": metrics.PROFILER.running})
+    return Response(metrics.PROFILER.collapsed(), mimetype="text/plain")
 
 @app.route("/api/current_status")
-def current_status():
-    return jsonify({
-        "camera": "started" if running else "stopped",
-        "known_count": len(known_encodings),
+@app.route("/api/current_status/<cam_id>")
+def current_status(cam_id=None):
+    cam = _camera(cam_id)
+    if cam is None:
+        return _no_camera(cam_id)
+    return _etag_json(cam, lambda: {
+        "camera": "started" if cam.running else "stopped",
+        "known_count": _known_count(),
         "mirror": MIRROR,
         "engine": ENGINE_NAME,
-        "emotion": last_emotion,         # ← 최신 감정 결과
-        "confidence": last_confidence    # ← 확률값 (0~1)
+        "emotion": cam.state["last_emotion"],   # ← 최신 감정 결과
+        "confidence": cam.state["last_conf"],   # ← 확률값 (0~1)
     })
 
 @app.route("/api/status")
-def api_status():
+@app.route("/api/status/<cam_id>")
+def api_status(cam_id=None):
     """프론트 폴링용 상세 상태"""
-    return jsonify({
-        "camera": "started" if running else "stopped",
+    cam = _camera(cam_id)
+    if cam is None:
+        return _no_camera(cam_id)
+    state = cam.state
+    return _etag_json(cam, lambda: {
+        "id": cam.id,
+        "camera": "started" if cam.running else "stopped",
         "faces": state["faces"],
         "names": state["last_names"],
         "emotion": state["last_emotion"],
         "conf": state["last_conf"],
         "error": state["last_error"],
         "tick": state["tick"],
-        "known_count": len(known_encodings),
+        "known_count": _known_count(),
         "mirror": MIRROR,
         "engine": state["engine"],
+        "detect": cam.pipe.scheduler.stats() if cam.pipe else None,
     })
 
 # === 추가된 라우트들: routes_emotion.py 기능 흡수 ===
 @app.route("/api/face_state")
-def face_state():
+@app.route("/api/face_state/<cam_id>")
+def face_state(cam_id=None):
     """
     최신 감정 1개(라벨/스코어)와 ok(stale 여부)를 반환
     """
+    cam = _camera(cam_id)
+    if cam is None:
+        return _no_camera(cam_id)
+    state = cam.state
     probs = state.get("last_probs")
     if not probs:
         probs = {"neutral": 1.0}
@@ -308,63 +587,234 @@ def face_state():
     return jsonify({"ok": (not stale), "label": label, "score": round(score, 4), "probs": probs7})
 
 @app.route("/api/emotion")
-def emotion():
+@app.route("/api/emotion/<cam_id>")
+def emotion(cam_id=None):
     """
     엔진, 최근 FPS(이동평균), 최근 감정 분포와 TOP 반환
     """
-    # FPS 이동평균
-    fps = round(sum(fps_ma) / len(fps_ma), 2) if fps_ma else None
-
-    probs = state.get("last_probs")
-    if not probs:
-        probs = {"neutral": 1.0}
-    probs7 = _complete7(probs)
-    top = max(probs7, key=probs7.get)
-    return jsonify({
-        "engine": ENGINE_NAME,
-        "fps": fps,
-        "emotions": probs7,
-        "top": {"label": top, "score": float(probs7[top])}
-    })
+    cam = _camera(cam_id)
+    if cam is None:
+        return _no_camera(cam_id)
+
+    def build():
+        # FPS 이동평균
+        fps_ma = cam.fps_ma
+        fps = round(sum(fps_ma) / len(fps_ma), 2) if fps_ma else None
+
+        probs = cam.state.get("last_probs")
+        if not probs:
+            probs = {"neutral": 1.0}
+        probs7 = _complete7(probs)
+        top = max(probs7, key=probs7.get)
+        return {
+            "engine": ENGINE_NAME,
+            "fps": fps,
+            "emotions": probs7,
+            "top": {"label": top, "score": float(probs7[top])}
+        }
+    return _etag_json(cam, build)
 
 @app.route("/api/history")
-def history():
+@app.route("/api/history/<cam_id>")
+def history(cam_id=None):
     """
-    최근 감정 히스토리(시간ms, 확률분포, 엔진)를 FIFO로 반환
+    감정 히스토리 조회
+      파라미터 없음         : 최근 HIST_MAX개 원본 행(시간ms, 확률분포, 이름, 트랙) FIFO
+      from/to(ms)          : 구간 원본 행 (최근 limit개, 기본 HIST_MAX, 최대 HIST_LIMIT_MAX)
+      from/to + bucket(ms) : 서버 다운샘플링 — 구간별 평균/최대, 우세 감정
+      name                 : 특정 등록자만
     """
-    return jsonify(ok=True, data=list(emotion_hist))
+    cam = _camera(cam_id)
+    if cam is None:
+        return _no_camera(cam_id)
+    def _int_arg(key):
+        v = request.args.get(key)
+        return int(v) if v not in (None, "") else None
+    try:
+        t_from, t_to, bucket = _int_arg("from"), _int_arg("to"), _int_arg("bucket")
+        limit = _int_arg("limit")
+    except ValueError:
+        return jsonify(ok=False, msg="from/to/bucket/limit must be integers"), 400
+    if limit is None:
+        limit = HIST_MAX
+    elif not 0 < limit <= HIST_LIMIT_MAX:
+        return jsonify(ok=False, msg=f"limit must be 1..{HIST_LIMIT_MAX}"), 400
+    name = request.args.get("name") or None
+    if bucket is not None:
+        if bucket <= 0:
+            return jsonify(ok=False, msg="bucket must be > 0"), 400
+        data = cam.hist.buckets(t_from, t_to, bucket, name=name)
+        return jsonify(ok=True, engine=ENGINE_NAME, bucket=bucket, data=data)
+    data = cam.hist.rows(t_from, t_to, name=name, limit=limit)
+    return jsonify(ok=True, engine=ENGINE_NAME, data=data)
 
 @app.route("/api/register_face", methods=["POST"])
 def register_face():
     """
-    body: { "name": "홍길동" }
-    현재 latest_frame(원본)에서 얼굴 1개를 찾아 인코딩 저장
+    body: { "name": "홍길동", "camera": "front"(선택, 기본 카메라) }
+    해당 카메라의 마지막 원본 프레임에서 얼굴 1개를 찾아 인코딩 저장 — 갤러리는 모든 카메라가 공유
     """
+    if not ready_event.is_set():
+        return _not_ready()
     data = request.get_json(silent=True) or {}
     name = (data.get("name") or "").strip()
     if not name:
         return jsonify({"ok": False, "msg": "name required"}), 400
-    if latest_frame is None:
-        return jsonify({"ok": False, "msg": "no frame yet"}), 409
-
-    frame = latest_frame.copy()  # 원본 사용 (미러링 안 됨)
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    boxes = face_recognition.face_locations(rgb, model="hog")
+    cam = _camera(data.get("camera"))
+    if cam is None:
+        return _no_camera(data.get("camera"))
+    with cam.hold_latest() as frame:  # 원본 사용 (미러링 안 됨), RGB 변환이 곧 복사본
+        if frame is None:
+            return jsonify({"ok": False, "msg": "no frame yet"}), 409
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    # 원본 해상도 검출/인코딩은 이미 모델이 올라가 있는 검출 워커에서 (이 프로세스는 dlib을 import하지 않음)
+    boxes, encs, _ = get_pool(DETECT_WORKERS).submit(detect_job, [(0, 0, rgb)]).result()
     if len(boxes) != 1:
         return jsonify({"ok": False, "msg": f"need exactly 1 face, got {len(boxes)}"}), 400
-    enc = face_recognition.face_encodings(rgb, boxes)[0]
-
-    replaced = False
-    for e in known_encodings:
-        if e["name"] == name:
-            e["encoding"] = enc
-            replaced = True
-            break
-    if not replaced:
-        known_encodings.append({"name": name, "encoding": enc})
+    enc = encs[0]
+
+    replaced = gallery.add(name, enc)
     save_db()
     return jsonify({"ok": True, "name": name, "updated": replaced})
 
+@app.route("/api/faces")
+def list_faces():
+    if not ready_event.is_set():
+        return _not_ready()
+    return jsonify({"ok": True, "count": len(gallery), "names": gallery.names})
+
+@app.route("/api/faces/<name>", methods=["DELETE"])
+def delete_face(name):
+    if not ready_event.is_set():
+        return _not_ready()
+    if not gallery.remove(name):
+        return jsonify({"ok": False, "msg": "unknown name"}), 404
+    save_db()
+    return jsonify({"ok": True, "name": name})
+
+@app.route("/api/enroll", methods=["GET", "POST"])
+def enroll():
+    """
+    일괄 등록 작업 시작 / 목록
+      POST multipart file=<zip>               : 업로드한 zip (<이름>/*.jpg 또는 <이름>_번호.jpg)
+      POST { "path": "roster" }               : DATA_DIR 아래 폴더 또는 zip
+      GET                                      : 작업 목록
+    작업은 바로 job id를 돌려주고 백그라운드에서 진행 → GET /api/enroll/<id>로 진행률 확인
+    """
+    if not ready_event.is_set():
+        return _not_ready()
+    if request.method == "GET":
+        return jsonify({"ok": True, "jobs": enroller.list()})
+    upload = request.files.get("file")
+    if upload is not None:
+        fd, tmp = tempfile.mkstemp(suffix=".zip", dir=DATA_DIR)
+        os.close(fd)
+        upload.save(tmp)
+        try:
+            job = enroller.from_path(tmp, cleanup=lambda: os.remove(tmp))
+        except Exception as e:
+            os.remove(tmp)
+            return jsonify({"ok": False, "msg": f"bad zip: {e}"}), 400
+        return jsonify({"ok": True, "job": job.to_dict()}), 202
+    data = request.get_json(silent=True) or {}
+    rel = (data.get("path") or "").strip()
+    path = os.path.realpath(os.path.join(DATA_DIR, rel))
+    if not rel or not path.startswith(os.path.realpath(DATA_DIR) + os.sep) or not os.path.exists(path):
+        return jsonify({"ok": False, "msg": "path must be a folder or zip under data/"}), 400
+    try:
+        job = enroller.from_path(path)
+    except Exception as e:
+        return jsonify({"ok": False, "msg": f"cannot read {rel}: {e}"}), 400
+    return jsonify({"ok": True, "job": job.to_dict()}), 202
+
+@app.route("/api/enroll/burst", methods=["POST"])
+def enroll_burst():
+    """
+    body: { "name": "홍길동", "camera": "front"(선택), "frames": 10, "interval_ms": 200 }
+    라이브 프레임 여러 장을 모아 품질 좋은 샘플의 robust mean으로 등록
+    """
+    if not ready_event.is_set():
+        return _not_ready()
+    data = request.get_json(silent=True) or {}
+    name = (data.get("name") or "").strip()
+    if not name:
+        return jsonify({"ok": False, "msg": "name required"}), 400
+    cam = _camera(data.get("camera"))
+    if cam is None:
+        return _no_camera(data.get("camera"))
+    if not cam.running:
+        return jsonify({"ok": False, "msg": "camera not started"}), 409
+    try:
+        frames = max(1, min(50, int(data.get("frames", 10))))
+        interval = max(0.05, float(data.get("interval_ms", 200)) / 1000.0)
+    except (TypeError, ValueError):
+        return jsonify({"ok": False, "msg": "frames/interval_ms must be numbers"}), 400
+    def grab():
+        with cam.hold_latest() as frame:
+            return None if frame is None else frame.copy()   # 워커 프로세스로 보낼 샘플
+    job = enroller.from_frames(name, grab, frames, interval)
+    return jsonify({"ok": True, "job": job.to_dict()}), 202
+
+@app.route("/api/enroll/<job_id>")
+def enroll_job(job_id):
+    job = enroller.get(job_id) if enroller else None
+    if job is None:
+        return jsonify({"ok": False, "msg": "unknown job"}), 404
+    return jsonify({"ok": True, "job": job.to_dict(detail=True)})
+
+@app.route("/api/enroll/<job_id>/cancel", methods=["POST"])
+def enroll_cancel(job_id):
+    job = enroller.get(job_id) if enroller else None
+    if job is None:
+        return jsonify({"ok": False, "msg": "unknown job"}), 404
+    job.cancel()
+    return jsonify({"ok": True, "job": job.to_dict()})
+
+@app.route("/api/batch", methods=["GET", "POST"])
+def batch_jobs():
+    """
+    녹화 영상 일괄 분석 작업 시작 / 목록
+      POST { "path": "sessions/0612.mp4", "every": 0.2, "chunk_sec": 30, "scale": 0.5, "csv": true, "restart": false }
+      GET  : 작업 목록
+    결과는 data/batch/<파일명>/faces.npz(+ faces.csv). 같은 요청을 다시 보내면 끝난 청크는 건너뜀.
+    큰 파일/전체 코어를 쓰려면 CLI(python batch.py) 사용 — API 작업은 라이브 카메라와 워커를 나눠 씀.
+    """
+    if not ready_event.is_set():
+        return _not_ready()
+    if request.method == "GET":
+        return jsonify({"ok": True, "jobs": batcher.list()})
+    data = request.get_json(silent=True) or {}
+    rel = (data.get("path") or "").strip()
+    path = os.path.realpath(os.path.join(DATA_DIR, rel))
+    if not rel or not path.startswith(os.path.realpath(DATA_DIR) + os.sep) or not os.path.isfile(path):
+        return jsonify({"ok": False, "msg": "path must be a video file under data/"}), 400
+    try:
+        opts = {k: float(data[k]) for k in ("every", "chunk_sec", "scale") if k in data}
+    except (TypeError, ValueError):
+        return jsonify({"ok": False, "msg": "every/chunk_sec/scale must be numbers"}), 400
+    if opts.get("every", 1) <= 0 or opts.get("chunk_sec", 1) <= 0 or not 0 < opts.get("scale", 1) <= 1:
+        return jsonify({"ok": False, "msg": "every/chunk_sec must be > 0, scale in (0, 1]"}), 400
+    try:
+        job = batcher.submit(path, csv=bool(data.get("csv")), restart=bool(data.get("restart")), **opts)
+    except ValueError as e:
+        return jsonify({"ok": False, "msg": str(e)}), 409
+    return jsonify({"ok": True, "job": job.to_dict()}), 202
+
+@app.route("/api/batch/<job_id>")
+def batch_job(job_id):
+    job = batcher.get(job_id) if batcher else None
+    if job is None:
+        return jsonify({"ok": False, "msg": "unknown job"}), 404
+    return jsonify({"ok": True, "job": job.to_dict()})
+
+@app.route("/api/batch/<job_id>/cancel", methods=["POST"])
+def batch_cancel(job_id):
+    job = batcher.get(job_id) if batcher else None
+    if job is None:
+        return jsonify({"ok": False, "msg": "unknown job"}), 404
+    job.cancel()
+    return jsonify({"ok": True, "job": job.to_dict()})
+
 @app.route("/")
 def root():
     # 프로젝트 루트의 index.html 반환
@@ -374,6 +824,8 @@ def root():
 def favicon():
     return ("", 204)  # 파비콘 404 로그 방지
 
+init()
+
 if __name__ == "__main__":
     # 환경에 맞게 호스트/포트 조정
-    app.run(host="0.0.0.0", port=5001, debug=True)
+    app.run(host="0.0.0.0", port=5001, debug=DEBUG)
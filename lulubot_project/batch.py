@@ -0,0 +1,395 @@
+# batch.py — 녹화 영상 오프라인 일괄 분석: 시간 구간(청크)별로 워커 프로세스에서 병렬 처리
+#
+#   python batch.py data/session.mp4                         # → data/batch/session/ (코어 수만큼 병렬)
+#   python batch.py data/session.mp4 --every 0.2 --chunk-sec 30 --scale 0.5 --csv
+#   python batch.py data/session.mp4 --restart               # 이전 진행 기록 무시하고 처음부터
+#
+# 라이브 파이프라인과 같은 단계(축소 → HOG → face_encodings → 갤러리 매칭 → 감정 7클래스)를
+# 웹캠 재생 없이 디코딩 속도로 돌린다. 청크마다 chunk-<i>.npz를 원자적으로 쓰고 manifest.json에
+# 분할/설정을 남기므로, 중단 후 같은 명령을 다시 실행하면 끝난 청크는 건너뛴다.
+# 결과(faces.npz, 선택 faces.csv): 얼굴 1개 = 1행 — frame, t_ms, box(top,right,bottom,left), name, dist, probs(7)
+#                                  샘플 프레임 1개 = 1행 — frames_idx, frames_t_ms, frames_faces
+import os, csv, glob, json, time, uuid, argparse, threading, traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import cv2
+
+from emotions import EMOTIONS, load_engine, _complete7
+from gallery import FaceGallery
+from pipeline import detect_job, get_pool, pool_workers, fair_share
+
+EVERY_SEC = 0.2       # 샘플 간격(초) — 라이브 검출 주기와 비슷하게
+CHUNK_SEC = 30.0      # 청크 길이(초) — 짧을수록 재개/진행률이 촘촘하고 워커 분배가 고르다
+SCALE = 0.5           # 검출용 축소 비율 (녹화본은 실시간 예산이 없으므로 라이브보다 크게)
+FACE_THRESH = 0.50
+OUT_ROOT = os.path.join(os.getcwd(), "data", "batch")
+JOB_KEEP = 20         # 완료된 작업 기록 보관 수
+
+_engines = {}         # 워커 프로세스별 감정 엔진 캐시 (설정 → 엔진)
+_galleries = {}       # 워커 프로세스별 갤러리 캐시 (경로, 수정 시각) → FaceGallery
+
+
+def _engine(spec):
+    key = json.dumps(spec, sort_keys=True)
+    if key not in _engines:
+        spec = dict(spec)
+        _engines[key] = load_engine(spec.pop("name", "heuristic"), **spec)[0]
+    return _engines[key]
+
+def save_gallery(out_dir, gallery):
+    """
+    갤러리 스냅샷 (names, encs, sqn)을 out_dir/gallery.*로 한 번 기록 → 경로 (비었으면 None).
+    청크마다 행렬을 피클해 보내지 않고 워커가 메모리 맵으로 연다.
+    """
+    if not gallery or not len(gallery[0]):
+        return None
+    names, encs, sqn = gallery
+    base = os.path.join(out_dir, "gallery")
+    for ext, a in ((".enc.npy", encs), (".sqn.npy", sqn)):
+        with open(base + ext + ".tmp", "wb") as f:
+            np.save(f, np.asarray(a, dtype=np.float32))
+        os.replace(base + ext + ".tmp", base + ext)
+    with open(base + ".json.tmp", "w", encoding="utf-8") as f:
+        json.dump({"names": list(names)}, f, ensure_ascii=False)
+    os.replace(base + ".json.tmp", base + ".json")
+    return base
+
+def _load_gallery(base):
+    if base is None:
+        return None
+    key = (base, os.stat(base + ".json").st_mtime_ns)
+    if key not in _galleries:
+        _galleries.clear()
+        with open(base + ".json", "r", encoding="utf-8") as f:
+            names = json.load(f)["names"]
+        _galleries[key] = FaceGallery.from_matrix(names, np.load(base + ".enc.npy", mmap_mode="r"),
+                                                  np.load(base + ".sqn.npy", mmap_mode="r"), mode="flat")
+    return _galleries[key]
+
+def probe(video):
+    """(fps, 프레임 수) — 컨테이너가 값을 안 주면 fps 30, 프레임 수 0"""
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise ValueError(f"cannot open video: {video}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    finally:
+        cap.release()
+    return (fps if 1.0 <= fps <= 240.0 else 30.0), max(0, n)
+
+def plan_chunks(nframes, fps, chunk_sec):
+    """[(시작 프레임, 끝 프레임)] — 마지막 청크의 끝은 -1(파일 끝까지, 프레임 수 추정이 틀려도 안전)"""
+    size = max(1, int(round(chunk_sec * fps)))
+    starts = list(range(0, max(1, nframes), size))
+    return [(s, starts[i + 1] if i + 1 < len(starts) else -1) for i, s in enumerate(starts)]
+
+def _columns(rows, frames):
+    names = [r[3] for r in rows]
+    return {
+        "frame": np.array([r[0] for r in rows], dtype=np.int32),
+        "t_ms": np.array([r[1] for r in rows], dtype=np.int64),
+        "box": np.array([r[2] for r in rows], dtype=np.int32).reshape(-1, 4),
+        "name": np.array(names, dtype=str) if names else np.zeros(0, dtype="<U1"),
+        "dist": np.array([r[4] for r in rows], dtype=np.float32),
+        "probs": np.array([r[5] for r in rows], dtype=np.float32).reshape(-1, len(EMOTIONS)),
+        "frames_idx": np.array([f[0] for f in frames], dtype=np.int32),
+        "frames_t_ms": np.array([f[1] for f in frames], dtype=np.int64),
+        "frames_faces": np.array([f[2] for f in frames], dtype=np.int16),
+    }
+
+def _save_npz(path, cols):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, labels=np.array(EMOTIONS), **cols)
+    os.replace(tmp, path)
+
+def analyze_chunk(video, start, end, step, fps, scale, model, gallery, thresh, engine, out_path):
+    """
+    워커 프로세스에서 실행: 프레임 [start, end) 중 번호가 step의 배수인 것을 분석해 out_path(.npz)에 기록
+    (청크 경계와 무관하게 영상 전체에서 같은 간격). 건너뛰는 프레임은 grab()만(색 변환/복사 없음).
+    gallery: save_gallery()가 돌려준 경로 또는 None.
+    반환: {frames, faces, sec}
+    """
+    t0 = time.time()
+    g = _load_gallery(gallery)
+    predictor = _engine(engine)
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise ValueError(f"cannot open video: {video}")
+    rows, frames = [], []
+    try:
+        if start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        i = start
+        while end < 0 or i < end:
+            if i % step:
+                if not cap.grab():
+                    break
+                i += 1
+                continue
+            ok, frame = cap.read()
+            if not ok:
+                break
+            t_ms = int(round(i * 1000.0 / fps))
+            small = cv2.resize(frame, (0, 0), fx=scale, fy=scale) if scale != 1.0 else frame
+            boxes, encs, _ = detect_job([(0, 0, cv2.cvtColor(small, cv2.COLOR_BGR2RGB))], model)
+            boxes = [tuple(int(round(v / scale)) for v in b) for b in boxes]
+            matches = g.match(encs, thresh) if g is not None and encs else [("Unknown", float("inf"))] * len(boxes)
+            probs = predictor.predict_batch([frame[max(0, t): b, max(0, l): r] for (t, r, b, l) in boxes])
+            for box, (name, dist), p in zip(boxes, matches, probs):
+                p7 = _complete7(p)
+                rows.append((i, t_ms, box, name, dist, [p7[k] for k in EMOTIONS]))
+            frames.append((i, t_ms, len(boxes)))
+            i += 1
+    finally:
+        cap.release()
+    _save_npz(out_path, _columns(rows, frames))
+    return {"frames": len(frames), "faces": len(rows), "sec": round(time.time() - t0, 3)}
+
+def merge(out_dir, n, csv_path=None):
+    """chunk-*.npz(순서대로) → faces.npz (+ faces.csv)"""
+    parts = []
+    for i in range(n):
+        with np.load(os.path.join(out_dir, f"chunk-{i:05d}.npz")) as z:
+            parts.append({k: z[k] for k in z.files if k != "labels"})
+    cols = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]} if parts else _columns([], [])
+    _save_npz(os.path.join(out_dir, "faces.npz"), cols)
+    if csv_path:
+        tmp = csv_path + ".tmp"
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["frame", "t_ms", "top", "right", "bottom", "left", "name", "dist"] + EMOTIONS)
+            for j in range(len(cols["frame"])):
+                w.writerow([int(cols["frame"][j]), int(cols["t_ms"][j]), *map(int, cols["box"][j]),
+                            cols["name"][j], f"{cols['dist'][j]:.4f}", *(f"{v:.4f}" for v in cols["probs"][j])])
+        os.replace(tmp, csv_path)
+    return len(cols["frame"])
+
+
+class BatchJob:
+    """
+    영상 1개 분석 작업. run()은 호출한 스레드에서 끝까지(CLI), start()는 별도 스레드에서(API).
+    pool이 None이면 공유 검출 풀을 라이브 카메라와 fair_share로 나눠 쓰고,
+    ProcessPoolExecutor를 넘기면 그 풀을 전부 쓴다.
+    """
+    def __init__(self, video, out_dir, gallery=None, engine=None, every=EVERY_SEC, chunk_sec=CHUNK_SEC,
+                 scale=SCALE, model="hog", thresh=FACE_THRESH, csv=False, restart=False, pool=None, workers=None,
+                 log=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.video = os.path.abspath(video)
+        self.out_dir = out_dir
+        self.params = {"every": float(every), "chunk_sec": float(chunk_sec), "scale": float(scale), "model": model,
+                       "thresh": float(thresh), "engine": engine or {"name": "heuristic"}}
+        self.csv = csv
+        self.status = "queued"
+        self.total = 0
+        self.done = 0
+        self.skipped = 0      # 이전 실행에서 끝나 있던 청크
+        self.frames = 0
+        self.faces = 0
+        self.duration = None  # 영상 길이(초, 추정)
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._gallery = gallery   # (names, encs, sqn) 스냅샷
+        self._restart = restart
+        self._pool = pool
+        self._workers = workers
+        self._log = log
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self.run, name=f"batch-{self.id}", daemon=True).start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _chunk_path(self, i):
+        return os.path.join(self.out_dir, f"chunk-{i:05d}.npz")
+
+    def _prepare(self):
+        """manifest.json을 읽어 이어서 할지 결정. 다른 영상/설정의 진행 기록이면 restart 없이는 거부"""
+        os.makedirs(self.out_dir, exist_ok=True)
+        st = os.stat(self.video)
+        source = {"path": self.video, "size": st.st_size, "mtime": int(st.st_mtime)}
+        mpath = os.path.join(self.out_dir, "manifest.json")
+        if os.path.exists(mpath) and not self._restart:
+            with open(mpath, "r", encoding="utf-8") as f:
+                m = json.load(f)
+            if m.get("source") != source or m.get("params") != self.params:
+                raise ValueError(f"{self.out_dir} holds a different run (video or settings changed); use restart")
+            return m
+        for p in glob.glob(os.path.join(self.out_dir, "chunk-*.npz")) + glob.glob(os.path.join(self.out_dir, "faces.*")) \
+                + glob.glob(os.path.join(self.out_dir, "gallery.*")):
+            os.remove(p)
+        fps, nframes = probe(self.video)
+        m = {"source": source, "params": self.params, "fps": fps, "frames": nframes,
+             "chunks": plan_chunks(nframes, fps, self.params["chunk_sec"]), "status": "running"}
+        self._write_manifest(m)
+        return m
+
+    def _write_manifest(self, m):
+        path = os.path.join(self.out_dir, "manifest.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(m, f, ensure_ascii=False, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def _on_result(self, i, res):
+        with self._lock:
+            self.done += 1
+            self.frames += res["frames"]
+            self.faces += res["faces"]
+        if self._log:
+            self._log(f"chunk {i + 1}/{self.total}: {res['frames']} frames, {res['faces']} faces, {res['sec']}s")
+
+    def run(self):
+        self.status = "running"
+        shared = self._pool is None
+        if shared:
+            fair_share.join()
+        pending = {}   # future -> 청크 번호
+        try:
+            m = self._prepare()
+            p = self.params
+            fps = m["fps"]
+            self.duration = round(m["frames"] / fps, 1) if m["frames"] else None
+            step = max(1, int(round(p["every"] * fps)))
+            chunks = m["chunks"]
+            self.total = len(chunks)
+            todo = [i for i in range(len(chunks)) if not os.path.exists(self._chunk_path(i))]
+            self.skipped = self.done = len(chunks) - len(todo)
+
+            gallery = save_gallery(self.out_dir, self._gallery)
+            pool = get_pool(self._workers) if shared else self._pool
+            it = iter(todo)
+            exhausted = False
+            while (pending or not exhausted) and not self._cancel.is_set():
+                limit = fair_share.quota(pool_workers()) if shared else self._workers or os.cpu_count() or 1
+                while not exhausted and len(pending) < limit:
+                    i = next(it, None)
+                    if i is None:
+                        exhausted = True
+                        break
+                    start, end = chunks[i]
+                    pending[pool.submit(analyze_chunk, self.video, start, end, step, fps, p["scale"], p["model"],
+                                        gallery, p["thresh"], p["engine"], self._chunk_path(i))] = i
+                if not pending:
+                    continue
+                finished, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    i = pending.pop(fut)
+                    self._on_result(i, fut.result())   # 청크 실패는 작업 실패(끝난 청크는 재실행 시 재사용)
+            if self._cancel.is_set():
+                self.status = "cancelled"
+                return
+            merge(self.out_dir, len(chunks), os.path.join(self.out_dir, "faces.csv") if self.csv else None)
+            m["status"] = "done"
+            self._write_manifest(m)
+            self.status = "done"
+        except Exception as e:
+            traceback.print_exc()
+            self.error = f"{type(e).__name__}: {e}"
+            self.status = "failed"
+        finally:
+            for fut in pending:
+                fut.cancel()
+            if shared:
+                fair_share.leave()
+            self.finished = time.time()
+
+    def to_dict(self):
+        with self._lock:
+            elapsed = (self.finished or time.time()) - self.created
+            processed = (self.done - self.skipped) / self.total * (self.duration or 0.0) if self.total else 0.0
+            return {
+                "id": self.id,
+                "video": os.path.basename(self.video),
+                "out": self.out_dir,
+                "status": self.status,
+                "total": self.total,
+                "done": self.done,
+                "skipped": self.skipped,
+                "progress": round(self.done / self.total, 4) if self.total else None,
+                "frames": self.frames,
+                "faces": self.faces,
+                "duration": self.duration,
+                "speed": round(processed / elapsed, 2) if elapsed > 0 and processed else None,  # 실시간 대비 배속
+                "params": self.params,
+                "error": self.error,
+                "elapsed": round(elapsed, 2),
+            }
+
+
+class BatchManager:
+    """API용 작업 생성/조회 — 갤러리는 작업 시작 시점의 스냅샷을 워커로 보낸다"""
+    def __init__(self, gallery, engine=None, workers=None, out_root=OUT_ROOT, thresh=FACE_THRESH):
+        self.gallery = gallery
+        self.engine = engine
+        self.workers = workers
+        self.out_root = out_root
+        self.thresh = thresh
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, video, **kwargs):
+        out_dir = os.path.join(self.out_root, os.path.splitext(os.path.basename(video))[0])
+        job = BatchJob(video, out_dir, gallery=self.gallery.snapshot(), engine=self.engine,
+                       thresh=self.thresh, workers=self.workers, **kwargs)
+        with self._lock:
+            if any(j.out_dir == out_dir and not j.finished for j in self.jobs.values()):
+                raise ValueError(f"{os.path.basename(out_dir)} is already being analysed")
+            self.jobs[job.id] = job
+            old = [j for j in self.jobs.values() if j.finished]
+            for j in sorted(old, key=lambda j: j.finished)[:max(0, len(old) - JOB_KEEP)]:
+                del self.jobs[j.id]
+        return job.start()
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        return [j.to_dict() for j in sorted(self.jobs.values(), key=lambda j: j.created, reverse=True)]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="LULUBOT 녹화 영상 일괄 분석 (청크 병렬, 재개 가능)")
+    ap.add_argument("video")
+    ap.add_argument("--out", help="출력 폴더 (기본 data/batch/<파일명>)")
+    ap.add_argument("--every", type=float, default=EVERY_SEC, help="샘플 간격(초)")
+    ap.add_argument("--chunk-sec", type=float, default=CHUNK_SEC)
+    ap.add_argument("--scale", type=float, default=SCALE, help="검출용 축소 비율")
+    ap.add_argument("--model", default="hog", help="face_recognition 검출 모델 (hog | cnn)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--gallery", default=os.path.join("data", "gallery"), help="갤러리 디렉터리(읽기 전용으로 엶)")
+    ap.add_argument("--thresh", type=float, default=FACE_THRESH)
+    ap.add_argument("--engine", default=os.environ.get("LULU_EMOTION_ENGINE", "heuristic"))
+    ap.add_argument("--engine-model", default=os.environ.get("LULU_EMOTION_MODEL", ""))
+    ap.add_argument("--engine-labels", default=os.environ.get("LULU_EMOTION_LABELS", ""))
+    ap.add_argument("--engine-input-scale", type=float, default=float(os.environ.get("LULU_EMOTION_INPUT_SCALE", "1.0")))
+    ap.add_argument("--csv", action="store_true", help="faces.csv도 기록")
+    ap.add_argument("--restart", action="store_true", help="이전 진행 기록을 지우고 처음부터")
+    args = ap.parse_args(argv)
+
+    gallery = None
+    if os.path.isdir(args.gallery):
+        from gallerystore import GalleryStore
+        g = GalleryStore(args.gallery).load(readonly=True, mode="flat")
+        gallery = g.snapshot()
+        print(f"[batch] gallery: {len(g)} faces")
+    engine = {"name": args.engine, "model_path": args.engine_model, "labels": args.engine_labels or None,
+              "input_scale": args.engine_input_scale}
+    out_dir = args.out or os.path.join(OUT_ROOT, os.path.splitext(os.path.basename(args.video))[0])
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        job = BatchJob(args.video, out_dir, gallery=gallery, engine=engine, every=args.every,
+                       chunk_sec=args.chunk_sec, scale=args.scale, model=args.model, thresh=args.thresh,
+                       csv=args.csv, restart=args.restart, pool=pool, workers=args.workers, log=print)
+        job.run()   # Ctrl+C로 끊어도 끝난 청크는 남아 다음 실행에서 이어감
+    print(json.dumps(job.to_dict(), ensure_ascii=False, indent=1))
+    return 0 if job.status == "done" else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
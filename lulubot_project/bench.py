@@ -0,0 +1,216 @@
+# bench.py — 오프라인 벤치마크: 웹캠 없이 검출 → 인식 → 감정 → 오버레이 → JPEG 경로의 단계별 성능 측정
+#
+#   python bench.py --frames 200 --res 640x480,1280x720 --faces 1,3 --gallery 0,1000,10000 --out bench.json
+#   python bench.py --source data/sample.mp4 --res 1280x720 --frames 300
+#   python bench.py ... --baseline bench_prev.json --tolerance 0.25   # p95 회귀 시 종료코드 1
+import argparse, json, os, platform, sys, time
+import numpy as np
+import cv2
+
+from emotions import load_engine
+from gallery import FaceGallery
+from overlay import draw_faces
+from sources import open_source
+
+STAGES = ["capture", "preprocess", "locate", "encode", "match", "emotion", "overlay", "flip", "jpeg"]
+
+
+def _summary(ms):
+    a = np.asarray(ms, dtype=np.float64)
+    if a.size == 0:
+        return {"n": 0}
+    p50, p95, p99 = np.percentile(a, [50, 95, 99])
+    mean = float(a.mean())
+    return {
+        "n": int(a.size),
+        "mean_ms": round(mean, 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "throughput_fps": round(1000.0 / mean, 2) if mean > 0 else None,
+    }
+
+def _random_gallery(size, mode, seed=0):
+    rng = np.random.default_rng(seed)
+    g = FaceGallery(mode=mode)
+    encs = rng.normal(0.0, 0.09, size=(size, 128)).astype(np.float32)  # 실제 인코딩과 비슷한 분포 크기
+    for i, e in enumerate(encs):
+        g.add(f"id{i:06d}", e)
+    return g
+
+def run_case(args, res, faces, gallery_size, fr, engine):
+    w, h = res
+    spec = args.source or f"synthetic:{w}x{h}:{faces}"
+    src = open_source(spec, **({"seed": args.seed, "face_dir": args.face_dir} if not args.source else {}))
+    if not src.isOpened():
+        raise SystemExit(f"cannot open source: {spec}")
+    gallery = _random_gallery(gallery_size, args.gallery_mode, args.seed)
+
+    times = {s: [] for s in STAGES}
+    totals, found = [], []
+    scale = args.scale
+    k = 1.0 / scale
+    try:
+        for i in range(args.warmup + args.frames):
+            rec = i >= args.warmup
+            t = {}
+            t0 = time.perf_counter()
+            ok, frame = src.read()
+            if not ok:
+                break
+            if frame.shape[1] != w or frame.shape[0] != h:
+                frame = cv2.resize(frame, (w, h))
+            t["capture"] = time.perf_counter()
+
+            small = cv2.resize(frame, (0, 0), fx=scale, fy=scale)
+            rgb_small = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+            t["preprocess"] = time.perf_counter()
+
+            boxes = fr.face_locations(rgb_small, model=args.model)
+            if args.boxes == "truth" and hasattr(src, "last_boxes"):
+                boxes = [tuple(int(v * scale) for v in b) for b in src.last_boxes]
+            t["locate"] = time.perf_counter()
+
+            encs = fr.face_encodings(rgb_small, boxes)
+            t["encode"] = time.perf_counter()
+
+            matches = gallery.match(encs, args.thresh)
+            t["match"] = time.perf_counter()
+
+            full = [tuple(int(round(v * k)) for v in b) for b in boxes]
+            rois = [frame[max(0, tt): bb, max(0, ll): rr] for (tt, rr, bb, ll) in full]
+            probs = engine.predict_batch(rois)
+            t["emotion"] = time.perf_counter()
+
+            faces_out = []
+            for box, (name, _), p in zip(full, matches, probs):
+                lbl = max(p, key=p.get)
+                faces_out.append((box, name, lbl, p[lbl]))
+            draw = draw_faces(frame.copy(), faces_out, engine.name, len(gallery))
+            t["overlay"] = time.perf_counter()
+
+            out = cv2.flip(draw, 1)
+            t["flip"] = time.perf_counter()
+
+            cv2.imencode(".jpg", out, [int(cv2.IMWRITE_JPEG_QUALITY), args.quality])
+            t["jpeg"] = time.perf_counter()
+
+            if rec:
+                prev = t0
+                for s in STAGES:
+                    times[s].append((t[s] - prev) * 1000.0)
+                    prev = t[s]
+                totals.append((t["jpeg"] - t0) * 1000.0)
+                found.append(len(boxes))
+    finally:
+        src.release()
+
+    return {
+        "source": spec,
+        "resolution": f"{w}x{h}",
+        "faces": faces,
+        "gallery": gallery_size,
+        "frames": len(totals),
+        "faces_found_avg": round(float(np.mean(found)), 2) if found else 0.0,
+        "stages": {s: _summary(times[s]) for s in STAGES},
+        "total": _summary(totals),
+    }
+
+def _key(run):
+    return (run["resolution"], run["faces"], run["gallery"])
+
+def compare(result, baseline, tolerance):
+    """baseline 대비 p95가 (1+tolerance)배를 넘은 단계 목록"""
+    base = {_key(r): r for r in baseline.get("runs", [])}
+    bad = []
+    for r in result["runs"]:
+        b = base.get(_key(r))
+        if not b:
+            continue
+        for s, cur in list(r["stages"].items()) + [("total", r["total"])]:
+            ref = (b["stages"].get(s) if s != "total" else b["total"]) or {}
+            if cur.get("p95_ms") and ref.get("p95_ms") and cur["p95_ms"] > ref["p95_ms"] * (1 + tolerance):
+                bad.append(f"{_key(r)} {s}: p95 {ref['p95_ms']}ms → {cur['p95_ms']}ms")
+    return bad
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="LULUBOT 파이프라인 오프라인 벤치마크")
+    ap.add_argument("--source", help="동영상 파일/이미지 폴더 (기본: 합성 프레임)")
+    ap.add_argument("--face-dir", help="합성 프레임에 붙일 실제 얼굴 사진 폴더")
+    ap.add_argument("--frames", type=int, default=100)
+    ap.add_argument("--warmup", type=int, default=5)
+    ap.add_argument("--res", default="640x480", help="쉼표 구분, 예: 640x480,1280x720")
+    ap.add_argument("--faces", default="1", help="쉼표 구분 얼굴 수(합성 소스)")
+    ap.add_argument("--gallery", default="0,1000", help="쉼표 구분 갤러리 크기")
+    ap.add_argument("--gallery-mode", default="auto", choices=["auto", "flat", "ivf"])
+    ap.add_argument("--boxes", default=None, choices=["detected", "truth"],
+                    help="truth: 합성 소스의 정답 박스로 인코딩/매칭/감정 단계 수행 "
+                         "(기본: 그린 타원 얼굴인 합성 소스는 truth, 실제 영상/--face-dir은 detected)")
+    ap.add_argument("--model", default="hog")
+    ap.add_argument("--scale", type=float, default=0.25)
+    ap.add_argument("--thresh", type=float, default=0.50)
+    ap.add_argument("--quality", type=int, default=80)
+    ap.add_argument("--engine", default="heuristic")
+    ap.add_argument("--engine-model", default="")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", help="결과 JSON 저장 경로 (기본: stdout)")
+    ap.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    args = ap.parse_args(argv)
+    if args.boxes is None:
+        # 합성 소스의 타원 얼굴은 렌더/인코딩 부하용이라 HOG가 못 찾는 게 보통 → 정답 박스로 측정
+        synthetic = not args.source or args.source.startswith("synthetic:")
+        args.boxes = "truth" if synthetic and not args.face_dir else "detected"
+
+    import face_recognition as fr
+    engine, note = load_engine(args.engine, model_path=args.engine_model)
+    if note:
+        print(f"[bench] {note}", file=sys.stderr)
+
+    runs = []
+    for res in args.res.split(","):
+        w, h = (int(v) for v in res.lower().split("x"))
+        for faces in (int(v) for v in args.faces.split(",")):
+            for g in (int(v) for v in args.gallery.split(",")):
+                print(f"[bench] {w}x{h} faces={faces} gallery={g} ...", file=sys.stderr)
+                runs.append(run_case(args, (w, h), faces, g, fr, engine))
+
+    result = {
+        "env": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "engine": engine.name,
+            "model": args.model,
+            "scale": args.scale,
+        },
+        "runs": runs,
+    }
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    empty = [_key(r) for r in runs if r["frames"] and r["faces"] and r["faces_found_avg"] == 0]
+    if empty:
+        # 얼굴을 넣은 조합에서 하나도 못 찾으면 encode/match/emotion은 빈 작업 시간만 잰 것 — 회귀 비교 의미 없음
+        # (--faces 0 기준선은 원래 얼굴이 없으므로 제외)
+        for k in empty:
+            print(f"[bench] ERROR {k}: no faces found (boxes={args.boxes}) — use --boxes truth or --face-dir",
+                  file=sys.stderr)
+        return 2
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            bad = compare(result, json.load(f), args.tolerance)
+        for line in bad:
+            print(f"[bench] REGRESSION {line}", file=sys.stderr)
+        return 1 if bad else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
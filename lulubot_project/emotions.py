@@ -1,8 +1,17 @@
 # emotions.py
+import os, threading
 import cv2
 import numpy as np
 
 EMOTIONS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+ALL7 = EMOTIONS
+_NEUTRAL = EMOTIONS.index("neutral")
+
+# 다른 라벨 체계(FER+ 등)의 이름을 7클래스로 맞추기 위한 별칭
+LABEL_ALIASES = {
+    "anger": "angry", "happiness": "happy", "sadness": "sad",
+    "surprised": "surprise", "fearful": "fear", "disgusted": "disgust",
+}
 
 def _complete7(d):
     out = {k: float(max(0.0, min(1.0, d.get(k, 0.0)))) for k in ALL7}
@@ -11,24 +20,217 @@ def _complete7(d):
         return {k: (1.0 if k=="neutral" else 0.0) for k in ALL7}
     return {k: out[k]/s for k in ALL7}
 
-class HeuristicEmotion:
-    def __init__(self, **kwargs): pass
+def preprocess_batch(rois, size=96):
+    """
+    얼굴 ROI 목록(BGR, 크기 제각각) → (N, size, size) float32 [0,1] 그레이 텐서 + 유효 마스크.
+    resize/cvtColor 결과를 미리 잡아둔 uint8 버퍼에 바로 쓰고, 정규화는 한 번에 수행한다.
+    """
+    n = len(rois)
+    buf = np.zeros((n, size, size), dtype=np.uint8)
+    valid = np.zeros(n, dtype=bool)
+    for i, roi in enumerate(rois):
+        if roi is None or roi.size == 0:
+            continue
+        img = cv2.resize(roi, (size, size), interpolation=cv2.INTER_AREA)
+        if img.ndim == 3:
+            cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=buf[i])
+        else:
+            buf[i] = img
+        valid[i] = True
+    return buf.astype(np.float32) * (1.0 / 255.0), valid
+
+
+class EmotionEngine:
+    """
+    감정 엔진 공통 인터페이스.
+    하위 클래스는 _score(batch:(N,H,W) float32) → (N,7) 점수(EMOTIONS 순서)만 구현하면 된다.
+    """
+    name = "base"
+    input_size = 96
+
+    @classmethod
+    def available(cls, **kwargs):
+        """필요한 런타임/모델 파일이 있는지 (예외 없이) 확인"""
+        return True
+
+    def predict_batch(self, rois):
+        """한 프레임의 모든 얼굴 ROI → [dict(7)] (한 번의 전처리 + 한 번의 추론)"""
+        if not rois:
+            return []
+        batch, valid = preprocess_batch(rois, self.input_size)
+        probs = np.zeros((len(rois), len(EMOTIONS)), dtype=np.float32)
+        probs[:, _NEUTRAL] = 1.0
+        if valid.any():
+            probs[valid] = self._normalize(self._score(batch[valid]))
+        return [dict(zip(EMOTIONS, map(float, row))) for row in probs]
 
     def predict(self, bgr_or_face_roi):
+        return self.predict_batch([bgr_or_face_roi])[0]
+
+    def _score(self, batch):
+        raise NotImplementedError
+
+    @staticmethod
+    def _normalize(scores):
+        s = np.clip(scores, 0.0, 1.0)
+        tot = s.sum(1, keepdims=True)
+        out = np.where(tot > 0, s / np.where(tot > 0, tot, 1.0), 0.0)
+        out[tot[:, 0] == 0, _NEUTRAL] = 1.0  # 아무 정보 없으면 neutral=1.0
+        return out
+
+
+class HeuristicEmotion(EmotionEngine):
+    name = "heuristic"
+
+    def __init__(self, **kwargs): pass
+
+    def _score(self, batch):
         # 아주 단순한 베이스라인: 밝기/대비로 happy/neutral 가중 (원하면 규칙 추가)
-        img = cv2.resize(bgr_or_face_roi, (96, 96))
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        mean = float(np.mean(gray)) / 255.0
-        std  = float(np.std(gray)) / 255.0
+        mean = batch.mean(axis=(1, 2))
+        std = batch.std(axis=(1, 2))
 
-        base = {k:0.0 for k in ALL7}
+        out = np.zeros((len(batch), len(EMOTIONS)), dtype=np.float32)
         # 예: 밝으면 happy↑, 너무 어두우면 sad/neutral 쪽
-        base["happy"]    = max(0.0, min(1.0, 0.2 + 0.8*mean))
-        base["sad"]      = max(0.0, min(1.0, 0.2 + 0.8*(1-mean)))
-        base["surprise"] = max(0.0, min(1.0, 0.3*std*2.0))
-        base["neutral"]  = max(0.0, 0.5 - 0.3*std)
+        out[:, EMOTIONS.index("happy")]    = np.clip(0.2 + 0.8 * mean, 0.0, 1.0)
+        out[:, EMOTIONS.index("sad")]      = np.clip(0.2 + 0.8 * (1 - mean), 0.0, 1.0)
+        out[:, EMOTIONS.index("surprise")] = np.clip(0.3 * std * 2.0, 0.0, 1.0)
+        out[:, EMOTIONS.index("neutral")]  = np.maximum(0.0, 0.5 - 0.3 * std)
+        return out
+
+
+class _ModelEmotion(EmotionEngine):
+    """
+    CPU 분류 모델 공통부: 입력 레이아웃(NCHW/NHWC)·크기 맞추기, 라벨 매핑, softmax
+    labels: 모델 출력 순서의 라벨 이름 (기본 FER2013 순서 = EMOTIONS). 7클래스에 없는 라벨은 무시.
+    input_scale: [0,1] 텐서에 곱할 값 (0~255 입력 모델이면 255)
+    """
+    def __init__(self, model_path, labels=None, input_scale=1.0, **kwargs):
+        self.model_path = model_path
+        self.input_scale = float(input_scale)
+        labels = labels or EMOTIONS
+        if isinstance(labels, str):
+            labels = [s.strip() for s in labels.split(",")]
+        self._cols = [(i, EMOTIONS.index(LABEL_ALIASES.get(l, l)))
+                      for i, l in enumerate(labels) if LABEL_ALIASES.get(l, l) in EMOTIONS]
+        self.nchw = True
+
+    @classmethod
+    def available(cls, model_path=None, **kwargs):
+        return bool(model_path) and os.path.exists(model_path) and cls._runtime() is not None
+
+    def _set_input_shape(self, shape):
+        # (N,1,H,W) 또는 (N,H,W,1)
+        dims = list(shape)
+        self.nchw = len(dims) == 4 and dims[1] in (1, 3) and dims[3] not in (1, 3)
+        hw = dims[2] if self.nchw else dims[1]
+        if isinstance(hw, (int, np.integer)) and hw > 0:
+            self.input_size = int(hw)
+        self.channels = (dims[1] if self.nchw else dims[3]) if len(dims) == 4 else 1
+        if not isinstance(self.channels, (int, np.integer)) or self.channels <= 0:
+            self.channels = 1
+
+    def _to_input(self, batch):
+        x = batch * self.input_scale
+        x = x[:, None] if self.nchw else x[..., None]
+        if self.channels == 3:
+            x = np.repeat(x, 3, axis=1 if self.nchw else 3)
+        return np.ascontiguousarray(x, dtype=np.float32)
+
+    def _to_scores(self, raw):
+        raw = np.asarray(raw, dtype=np.float32).reshape(len(raw), -1)
+        if (raw < 0).any() or not np.allclose(raw.sum(1), 1.0, atol=1e-3):
+            e = np.exp(raw - raw.max(1, keepdims=True))
+            raw = e / e.sum(1, keepdims=True)
+        out = np.zeros((len(raw), len(EMOTIONS)), dtype=np.float32)
+        for src, dst in self._cols:
+            out[:, dst] += raw[:, src]
+        return out
+
+
+class OnnxEmotion(_ModelEmotion):
+    name = "onnx"
+
+    @staticmethod
+    def _runtime():
+        try:
+            import onnxruntime
+            return onnxruntime
+        except ImportError:
+            return None
+
+    def __init__(self, model_path, threads=0, **kwargs):
+        super().__init__(model_path, **kwargs)
+        ort = self._runtime()
+        opts = ort.SessionOptions()
+        if threads:
+            opts.intra_op_num_threads = int(threads)
+        self.sess = ort.InferenceSession(model_path, sess_options=opts, providers=["CPUExecutionProvider"])
+        inp = self.sess.get_inputs()[0]
+        self.input_name = inp.name
+        self._set_input_shape(inp.shape)
+
+    def _score(self, batch):
+        raw = self.sess.run(None, {self.input_name: self._to_input(batch)})[0]
+        return self._to_scores(raw)
+
+
+class TFLiteEmotion(_ModelEmotion):
+    name = "tflite"
+
+    @staticmethod
+    def _runtime():
+        try:
+            from tflite_runtime.interpreter import Interpreter
+            return Interpreter
+        except ImportError:
+            pass
+        try:
+            import tensorflow as tf
+            return tf.lite.Interpreter
+        except ImportError:
+            return None
+
+    def __init__(self, model_path, threads=None, **kwargs):
+        super().__init__(model_path, **kwargs)
+        self.interp = self._runtime()(model_path=model_path, num_threads=int(threads) if threads else None)
+        self.interp.allocate_tensors()
+        self._in = self.interp.get_input_details()[0]
+        self._out = self.interp.get_output_details()[0]
+        self._set_input_shape(self._in["shape"])
+        self._batch = 1
+        self._lock = threading.Lock()  # Interpreter는 스레드 안전하지 않음(여러 카메라가 공유)
+
+    def _score(self, batch):
+        x = self._to_input(batch)
+        with self._lock:
+            if len(x) != self._batch:  # 배치 크기가 바뀔 때만 텐서 재할당
+                self.interp.resize_tensor_input(self._in["index"], x.shape)
+                self.interp.allocate_tensors()
+                self._batch = len(x)
+            self.interp.set_tensor(self._in["index"], x)
+            self.interp.invoke()
+            out = self.interp.get_tensor(self._out["index"])
+        return self._to_scores(out)
+
+
+# ---------- 엔진 레지스트리 ----------
+ENGINES = {
+    "heuristic": HeuristicEmotion,
+    "onnx": OnnxEmotion,
+    "tflite": TFLiteEmotion,
+}
 
-        return _complete7(base)
+def register_engine(name, cls):
+    ENGINES[name] = cls
 
-# FER 끄기
-FerEmotion = None
+def load_engine(name="heuristic", **kwargs):
+    """
+    설정된 엔진을 생성. 엔진이 없거나 런타임/모델 파일이 없으면 휴리스틱으로 폴백.
+    반환: (engine, 사유 문자열 or None)
+    """
+    cls = ENGINES.get(name)
+    if cls is None:
+        return HeuristicEmotion(), f"unknown engine: {name}"
+    if not cls.available(**kwargs):
+        return HeuristicEmotion(), f"{name} unavailable (runtime or model file missing)"
+    return cls(**kwargs), None
@@ -0,0 +1,323 @@
+# enroll.py — 일괄/다중 샘플 얼굴 등록 작업 (요청 스레드 밖에서, 공유 워커 풀로 병렬 인코딩)
+#
+#   사진 폴더/zip: <루트>/<이름>/*.jpg  또는  <루트>/<이름>[_번호].jpg
+#   라이브 버스트: 카메라 최신 프레임을 일정 간격으로 n장 모아 한 사람으로 등록
+import os, re, time, uuid, zipfile, threading, traceback
+from concurrent.futures import wait, FIRST_COMPLETED
+import numpy as np
+import cv2
+
+from pipeline import get_pool, pool_workers, fair_share
+from sources import IMAGE_EXTS
+
+MAX_SIDE = 1024        # 검출 전에 긴 변을 이 크기로 축소 (큰 사진의 HOG 비용 제한)
+MIN_FACE_PX = 64       # 원본 기준 얼굴 한 변 최소 크기
+MIN_SHARPNESS = 30.0   # 얼굴 영역 라플라시안 분산 최소값(흐림 판정)
+MAX_SAMPLES = 10       # 사람당 평균에 쓰는 상위 품질 샘플 수
+OUTLIER_DIST = 0.45    # 중앙값에서 이 거리 이상 떨어진 샘플은 다른 사람/오검출로 보고 제외
+JOB_KEEP = 50          # 완료된 작업 기록 보관 수
+
+
+def _decode(data):
+    if isinstance(data, np.ndarray):
+        return data
+    if isinstance(data, (bytes, bytearray)):
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    return cv2.imread(data)
+
+def face_quality(bgr, box):
+    """(얼굴 한 변 px, 선명도) — 선명도는 112x112로 맞춘 얼굴의 라플라시안 분산"""
+    t, r, b, l = box
+    size = min(b - t, r - l)
+    crop = bgr[max(0, t): b, max(0, l): r]
+    if crop.size == 0:
+        return size, 0.0
+    gray = cv2.cvtColor(cv2.resize(crop, (112, 112), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+    return size, float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+def encode_sample(label, data, model="hog"):
+    """
+    워커 프로세스에서 실행: 이미지 1장 → 얼굴 1개 인코딩 + 품질 점수
+    data: 파일 경로 | 인코딩된 이미지 bytes | BGR 배열
+    반환: {label, ok, reason, enc, size, sharpness, score}
+    """
+    import face_recognition  # 워커마다 최초 1회만 로드
+    out = {"label": label, "ok": False, "reason": None, "enc": None, "size": 0, "sharpness": 0.0, "score": 0.0}
+    bgr = _decode(data)
+    if bgr is None:
+        out["reason"] = "unreadable image"
+        return out
+    k = min(1.0, MAX_SIDE / max(bgr.shape[:2]))
+    small = cv2.resize(bgr, (0, 0), fx=k, fy=k, interpolation=cv2.INTER_AREA) if k < 1.0 else bgr
+    rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+    boxes = face_recognition.face_locations(rgb, model=model)
+    if not boxes:
+        out["reason"] = "no face"
+        return out
+    # 여러 명이면 가장 큰 얼굴이 두 번째보다 확실히(면적 2배) 클 때만 그 얼굴을 본인으로 본다
+    boxes.sort(key=lambda b: (b[2] - b[0]) * (b[1] - b[3]), reverse=True)
+    if len(boxes) > 1:
+        a0 = (boxes[0][2] - boxes[0][0]) * (boxes[0][1] - boxes[0][3])
+        a1 = (boxes[1][2] - boxes[1][0]) * (boxes[1][1] - boxes[1][3])
+        if a0 < 2 * a1:
+            out["reason"] = "multiple faces"
+            return out
+    box = boxes[0]
+    size, sharp = face_quality(bgr, tuple(int(round(v / k)) for v in box))
+    out["size"], out["sharpness"] = int(size), round(sharp, 1)
+    if size < MIN_FACE_PX:
+        out["reason"] = "face too small"
+        return out
+    if sharp < MIN_SHARPNESS:
+        out["reason"] = "blurry"
+        return out
+    out["enc"] = face_recognition.face_encodings(rgb, [box])[0].astype(np.float32)
+    out["score"] = round(min(1.0, size / 160.0) * min(1.0, sharp / 200.0), 4)
+    out["ok"] = True
+    return out
+
+def robust_mean(encs, weights=None, max_dist=OUTLIER_DIST):
+    """
+    샘플 인코딩들의 대표값: 좌표별 중앙값에서 max_dist 이내인 샘플만 품질 가중 평균.
+    반환: (대표 인코딩, 사용한 샘플 마스크)
+    """
+    x = np.asarray(encs, dtype=np.float32)
+    w = np.ones(len(x), dtype=np.float32) if weights is None else np.asarray(weights, dtype=np.float32)
+    d = np.linalg.norm(x - np.median(x, axis=0), axis=1)
+    keep = d < max_dist
+    if not keep.any():
+        keep[np.argmin(d)] = True
+    w = np.where(keep, np.maximum(w, 1e-3), 0.0)
+    return (x * w[:, None]).sum(0) / w.sum(), keep
+
+
+# ---------- 샘플 목록 ----------
+_SUFFIX = re.compile(r"[_\-\s]*\(?\d+\)?$")
+
+def _label_of(relpath):
+    """<이름>/파일.jpg → 이름, <이름>_2.jpg → 이름"""
+    parts = relpath.replace("\\", "/").strip("/").split("/")
+    if len(parts) > 1:
+        return parts[-2].strip()
+    stem = os.path.splitext(parts[-1])[0]
+    return _SUFFIX.sub("", stem).strip() or stem
+
+def list_dir(root):
+    """폴더 → [(이름, 경로)]"""
+    items = []
+    for dirpath, _, files in os.walk(root):
+        for f in sorted(files):
+            if f.lower().endswith(IMAGE_EXTS):
+                path = os.path.join(dirpath, f)
+                items.append((_label_of(os.path.relpath(path, root)), path))
+    return items
+
+def list_zip(zf):
+    """
+    zip → [(이름, 내부 경로)]. 최상위 폴더가 하나뿐이면 두 경우가 있다:
+      alice/IMG_0001.jpg ...            — 한 사람의 폴더(<이름>/*.jpg) → 폴더 이름
+      staff/alice_1.jpg, staff/bob_2.jpg — 평평한 <이름>_번호.jpg를 폴더째 압축 → 파일 이름
+    폴더를 뗐을 때 이름이 둘 이상으로 갈리면 후자로 보고, 아니면(1.jpg처럼 번호뿐인 파일 포함) 폴더 이름을 쓴다.
+    """
+    names = [n for n in sorted(zf.namelist())
+             if n.lower().endswith(IMAGE_EXTS) and not n.startswith("__MACOSX/")]
+    labels = [_label_of(n) for n in names]
+    tops = {n.split("/", 1)[0] for n in names}
+    if len(tops) == 1 and all("/" in n for n in names):
+        prefix = len(tops.pop()) + 1
+        stems = [os.path.splitext(n[prefix:].rsplit("/", 1)[-1])[0] for n in names]
+        stripped = [_label_of(n[prefix:]) for n in names]
+        if all(_SUFFIX.sub("", st).strip() for st in stems) and len(set(stripped)) > 1:
+            labels = stripped
+    return list(zip(labels, names))
+
+class EnrollJob:
+    """
+    등록 작업 1건. start() 후 별도 스레드에서
+    샘플 제출(공유 워커 풀, 참여자 몫만큼만 동시 제출) → 사람별 품질 상위 샘플 robust mean → 갤러리 반영.
+    items: [(이름, 경로|bytes|배열)] 또는 그런 튜플을 내는 이터레이터(라이브 버스트), total은 전체 개수
+    """
+    def __init__(self, kind, items, total, gallery, on_commit=None, workers=None, cleanup=None, source=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.source = source
+        self.status = "queued"
+        self.total = total
+        self.done = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.people = {}       # 이름 -> {samples, used, rejected, updated, reasons}
+        self._items = items
+        self._gallery = gallery
+        self._on_commit = on_commit
+        self._workers = workers
+        self._cleanup = cleanup
+        self._samples = {}     # 이름 -> [(score, enc)]
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._run, name=f"enroll-{self.id}", daemon=True).start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _person(self, name):
+        return self.people.setdefault(name, {"samples": 0, "used": 0, "rejected": 0, "updated": None, "reasons": {}})
+
+    def _on_result(self, res):
+        with self._lock:
+            self.done += 1
+            p = self._person(res["label"])
+            if res["ok"]:
+                self.accepted += 1
+                p["samples"] += 1
+                self._samples.setdefault(res["label"], []).append((res["score"], res["enc"]))
+            else:
+                self.rejected += 1
+                p["rejected"] += 1
+                p["reasons"][res["reason"]] = p["reasons"].get(res["reason"], 0) + 1
+
+    def _run(self):
+        self.status = "running"
+        fair_share.join()
+        try:
+            pool = get_pool(self._workers)
+            pending = {}   # future -> 이름
+            it = iter(self._items)
+            exhausted = False
+            while (pending or not exhausted) and not self._cancel.is_set():
+                quota = fair_share.quota(pool_workers())  # 라이브 카메라 검출과 워커를 나눠 씀
+                while not exhausted and len(pending) < quota:
+                    item = next(it, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    pending[pool.submit(encode_sample, *item)] = item[0]
+                if not pending:
+                    continue
+                finished, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    label = pending.pop(fut)
+                    try:
+                        self._on_result(fut.result())
+                    except Exception as e:
+                        self._on_result({"label": label, "ok": False, "reason": f"{type(e).__name__}: {e}"})
+            for fut in pending:
+                fut.cancel()
+            if hasattr(it, "close"):
+                it.close()   # 제너레이터(zip/버스트) 정리
+            if self._cancel.is_set():
+                self.status = "cancelled"
+                return
+            self.total = self.done   # 버스트가 시간 초과로 덜 모였을 수 있음
+            self._commit()
+            self.status = "done"
+        except Exception as e:
+            traceback.print_exc()
+            self.error = f"{type(e).__name__}: {e}"
+            self.status = "failed"
+        finally:
+            fair_share.leave()
+            self.finished = time.time()
+            if self._cleanup:
+                self._cleanup()
+
+    def _commit(self):
+        """사람별 품질 상위 MAX_SAMPLES개의 robust mean을 갤러리에 반영"""
+        for name, samples in self._samples.items():
+            samples.sort(key=lambda s: s[0], reverse=True)
+            top = samples[:MAX_SAMPLES]
+            enc, keep = robust_mean([e for _, e in top], [s for s, _ in top])
+            p = self.people[name]
+            p["used"] = int(keep.sum())
+            p["updated"] = self._gallery.add(name, enc)
+        if self._samples and self._on_commit:
+            self._on_commit()
+
+    def to_dict(self, detail=False):
+        with self._lock:
+            d = {
+                "id": self.id,
+                "kind": self.kind,
+                "source": self.source,
+                "status": self.status,
+                "total": self.total,
+                "done": self.done,
+                "progress": round(self.done / self.total, 4) if self.total else None,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "people": len(self.people),
+                "error": self.error,
+                "elapsed": round((self.finished or time.time()) - self.created, 2),
+            }
+            if detail:
+                d["results"] = {k: dict(v, reasons=dict(v["reasons"])) for k, v in self.people.items()}
+            return d
+
+
+class EnrollManager:
+    """작업 생성/조회. 오래된 완료 작업은 JOB_KEEP개까지만 보관"""
+    def __init__(self, gallery, on_commit=None, workers=None):
+        self.gallery = gallery
+        self.on_commit = on_commit
+        self.workers = workers
+        self.jobs = {}
+        self._commit_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def _commit(self):
+        if self.on_commit:
+            with self._commit_lock:
+                self.on_commit()
+
+    def _submit(self, kind, items, total, source, cleanup=None):
+        job = EnrollJob(kind, items, total, self.gallery, on_commit=self._commit,
+                        workers=self.workers, cleanup=cleanup, source=source)
+        with self._lock:
+            self.jobs[job.id] = job
+            old = [j for j in self.jobs.values() if j.finished]
+            for j in sorted(old, key=lambda j: j.finished)[:max(0, len(old) - JOB_KEEP)]:
+                del self.jobs[j.id]
+        return job.start()
+
+    def from_path(self, path, cleanup=None):
+        """폴더 또는 zip 파일 경로로 작업 시작"""
+        if os.path.isdir(path):
+            items = list_dir(path)
+            return self._submit("dir", items, len(items), path, cleanup)
+        zf = zipfile.ZipFile(path)
+        names = list_zip(zf)
+
+        def items():  # 압축 해제는 작업 스레드에서 제출 직전에 한 장씩
+            try:
+                for label, name in names:
+                    yield label, zf.read(name)
+            finally:
+                zf.close()
+        return self._submit("zip", items(), len(names), os.path.basename(path), cleanup)
+
+    def from_frames(self, name, grab, count=10, interval=0.2):
+        """
+        라이브 버스트: grab()이 돌려주는 최신 프레임(복사본)을 interval초 간격으로 count장 모아 한 사람으로 등록
+        """
+        def items():
+            n = 0
+            deadline = time.time() + count * interval * 5 + 2.0
+            while n < count and time.time() < deadline:
+                frame = grab()
+                if frame is not None:
+                    n += 1
+                    yield name, frame
+                time.sleep(interval)
+        return self._submit("burst", items(), count, name)
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        return [j.to_dict() for j in sorted(self.jobs.values(), key=lambda j: j.created, reverse=True)]
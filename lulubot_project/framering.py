@@ -0,0 +1,91 @@
+# framering.py — 미리 잡아둔 프레임 버퍼 링 (프레임마다 새 배열을 만들지 않도록)
+import threading
+from collections import deque
+import numpy as np
+
+import metrics
+
+
+class Frame:
+    """
+    링 슬롯 하나에 대한 참조. data는 슬롯 버퍼 그 자체(복사 아님)이고
+    참조 수가 0이 되면 슬롯이 링으로 돌아가 다음 프레임이 덮어쓴다.
+    프레임을 다른 스레드에 넘길 때는 retain()한 것을 넘기고, 받은 쪽이 다 쓰면 release().
+    gen은 획득 순번 — 같은 슬롯이라도 프레임마다 다르다.
+    """
+    __slots__ = ("data", "gen", "_ring", "_slot", "_refs")
+
+    def __init__(self, ring, slot, data, gen):
+        self.data = data
+        self.gen = gen
+        self._ring = ring
+        self._slot = slot
+        self._refs = 1
+
+    def retain(self):
+        with self._ring._lock:
+            self._refs += 1
+        return self
+
+    def release(self):
+        self._ring._release(self)
+
+    def __enter__(self):
+        return self.data
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class FrameRing:
+    """
+    고정 크기 버퍼 링. acquire(shape)는 가장 먼저 반납된 빈 슬롯을 돌려주고,
+    모든 슬롯이 사용 중이면(소비자가 너무 오래 붙잡음) 링 밖에 임시 버퍼를 만든다.
+    해상도가 바뀌면 해당 슬롯만 다시 할당한다. 정상 상태에서 할당 횟수는 늘지 않는다.
+    """
+    def __init__(self, size=8, dtype=np.uint8):
+        self.size = size
+        self.dtype = dtype
+        self._bufs = [None] * size
+        self._free = deque(range(size))
+        self._lock = threading.Lock()
+        self._gen = 0
+        self.allocs = 0
+        self.shape = None   # 마지막으로 요청된 프레임 크기
+
+    def _alloc(self, shape):
+        self.allocs += 1
+        metrics.FRAME_ALLOCS.inc()
+        return np.empty(shape, dtype=self.dtype)
+
+    def acquire(self, shape):
+        shape = tuple(shape)
+        with self._lock:
+            self._gen += 1
+            self.shape = shape
+            if not self._free:
+                return Frame(self, -1, self._alloc(shape), self._gen)
+            slot = self._free.popleft()
+            buf = self._bufs[slot]
+            if buf is None or buf.shape != shape:
+                buf = self._bufs[slot] = self._alloc(shape)
+            return Frame(self, slot, buf, self._gen)
+
+    def wrap(self, array):
+        """링 밖에서 만들어진 배열(소스가 버퍼를 못 받은 경우)을 같은 인터페이스로 감쌈"""
+        with self._lock:
+            self._gen += 1
+            self.shape = array.shape
+            return Frame(self, -1, array, self._gen)
+
+    def _release(self, frame):
+        with self._lock:
+            frame._refs -= 1
+            if frame._refs == 0 and frame._slot >= 0:
+                self._free.append(frame._slot)
+            elif frame._refs < 0:
+                raise RuntimeError("frame released more times than retained")
+
+    @property
+    def in_use(self):
+        return self.size - len(self._free)
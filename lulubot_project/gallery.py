@@ -0,0 +1,321 @@
+# gallery.py — 등록 얼굴 인코딩 인덱스 (벡터화 매칭)
+import threading
+import numpy as np
+
+ENC_DIM = 128          # face_recognition 인코딩 차원
+IVF_MIN_SIZE = 4096    # 이 이상이면 "auto" 모드에서 분할(IVF) 검색 사용
+IVF_REBUILD_RATIO = 0.25  # 마지막 학습 이후 이 비율만큼 늘면 재분할
+
+
+class FaceGallery:
+    """
+    등록된 인코딩을 연속된 float32 행렬 하나에 보관하고,
+    프레임의 모든 얼굴을 한 번의 배치 거리 계산으로 매칭한다.
+
+    mode:
+      "flat" — 전체 행렬 대상 정확 검색
+      "ivf"  — k-means 분할 후 가까운 nprobe개 분할만 검색(근사)
+      "auto" — 크기가 IVF_MIN_SIZE 이상이면 ivf, 아니면 flat
+    """
+    def __init__(self, dim=ENC_DIM, mode="auto", nprobe=8):
+        self.dim = dim
+        self.mode = mode
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        self._encs = np.zeros((64, dim), dtype=np.float32)
+        self._sqn = np.zeros(64, dtype=np.float32)   # 행별 제곱노름 캐시
+        self._names = []
+        self._index = {}   # name -> row
+        self._n = 0
+        self.version = 0   # add()/remove()마다 증가 (추적기의 Unknown 판정 재사용 여부 확인용)
+        self.on_change = None  # (op, name, enc) 변경 통지 — 잠금 안에서 호출(저장소 로그 순서 보장)
+        # IVF 상태
+        self._centroids = None
+        self._assign = None     # row -> 분할 번호
+        self._lists = None      # 분할별 행 번호 배열(역색인), add 시 무효화
+        self._trained_n = 0
+        self._building = False  # 백그라운드 재학습 진행 중
+        self._dirty = None      # 학습 중 바뀐 행(교체 시 새 분할로 재배정)
+        self._build_lock = threading.Lock()
+
+    # ---------- 생성/직렬화 ----------
+    @classmethod
+    def from_records(cls, records, **kwargs):
+        """[{name, encoding}] (기존 pickle 포맷)에서 생성"""
+        g = cls(**kwargs)
+        for e in records or []:
+            g.add(e["name"], e["encoding"])
+        return g
+
+    @classmethod
+    def from_matrix(cls, names, encs, sqn=None, **kwargs):
+        """
+        이름 목록 + (N 이상, dim) float32 행렬(메모리 맵 가능)로 바로 생성 — 복사하지 않으므로
+        페이지는 검색할 때 필요한 만큼만 읽힌다. N행 뒤의 여유 행은 이후 add()가 그대로 채우고,
+        읽기 전용 행렬이거나 여유가 바닥나면 그때 복사.
+        """
+        g = cls(**kwargs)
+        n = len(names)
+        if n == 0:
+            return g
+        g._encs = encs
+        g._sqn = sqn if sqn is not None else np.einsum("ij,ij->i", encs, encs).astype(np.float32)
+        g._names = list(names)
+        g._index = {name: i for i, name in enumerate(g._names)}
+        g._n = n
+        return g
+
+    def snapshot(self, on_taken=None):
+        """
+        현재 (이름 목록, 인코딩 행렬 복사본, 제곱노름 복사본).
+        on_taken은 같은 잠금 안에서 호출되므로 그 사이에 끼어든 변경이 없다.
+        """
+        with self._lock:
+            n = self._n
+            out = list(self._names), np.array(self._encs[:n]), np.array(self._sqn[:n])
+            if on_taken:
+                on_taken()
+            return out
+
+    def to_records(self):
+        with self._lock:
+            return [{"name": self._names[i], "encoding": self._encs[i].astype(np.float64)}
+                    for i in range(self._n)]
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def names(self):
+        return list(self._names)
+
+    # ---------- 갱신 ----------
+    def add(self, name, enc):
+        """이름이 이미 있으면 인코딩 교체(True 반환), 없으면 추가(False)"""
+        v = np.asarray(enc, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            self._writable()
+            row = self._index.get(name)
+            replaced = row is not None
+            if not replaced:
+                self._grow(self._n + 1)
+                row = self._n
+                self._n += 1
+                self._names.append(name)
+                self._index[name] = row
+            self._encs[row] = v
+            self._sqn[row] = float(v @ v)
+            self.version += 1
+            if self._dirty is not None:
+                self._dirty.add(row)
+            if self._centroids is not None:
+                self._assign_rows(row, row + 1)
+            if self.on_change:
+                self.on_change("update" if replaced else "enroll", name, v)
+            return replaced
+
+    def remove(self, name):
+        """등록 삭제 — 마지막 행을 빈 자리로 옮겨 행렬을 연속으로 유지. 없으면 False"""
+        with self._lock:
+            row = self._index.pop(name, None)
+            if row is None:
+                return False
+            self._writable()
+            last = self._n - 1
+            if row != last:
+                moved = self._names[last]
+                self._encs[row] = self._encs[last]
+                self._sqn[row] = self._sqn[last]
+                self._names[row] = moved
+                self._index[moved] = row
+                if self._assign is not None:
+                    self._assign[row] = self._assign[last]
+                if self._dirty is not None:
+                    self._dirty.add(row)
+            self._names.pop()
+            self._n = last
+            self._lists = None
+            self.version += 1
+            if self.on_change:
+                self.on_change("delete", name, None)
+            return True
+
+    def _writable(self):
+        """메모리 맵(읽기 전용) 행렬이면 여유 용량을 둔 메모리 배열로 복사"""
+        if self._encs.flags.writeable and self._sqn.flags.writeable:
+            return
+        cap = max(64, self._n + self._n // 4)
+        encs = np.zeros((cap, self.dim), dtype=np.float32)
+        encs[:self._n] = self._encs[:self._n]
+        sqn = np.zeros(cap, dtype=np.float32)
+        sqn[:self._n] = self._sqn[:self._n]
+        self._encs, self._sqn = encs, sqn
+        if self._assign is not None:
+            assign = np.zeros(cap, dtype=np.int32)
+            assign[:self._n] = self._assign[:self._n]
+            self._assign = assign
+
+    def _grow(self, need):
+        cap = self._encs.shape[0]
+        if need <= cap:
+            return
+        while cap < need:
+            cap *= 2
+        encs = np.zeros((cap, self.dim), dtype=np.float32)
+        encs[:self._n] = self._encs[:self._n]
+        sqn = np.zeros(cap, dtype=np.float32)
+        sqn[:self._n] = self._sqn[:self._n]
+        self._encs, self._sqn = encs, sqn
+        if self._assign is not None:
+            assign = np.zeros(cap, dtype=np.int32)
+            assign[:self._n] = self._assign[:self._n]
+            self._assign = assign
+
+    # ---------- 검색 ----------
+    def _dists(self, q, rows=None):
+        """q:(m,d) 와 행렬(rows 부분집합) 간 유클리드 거리 (m, n)"""
+        encs = self._encs[:self._n] if rows is None else self._encs[rows]
+        sqn = self._sqn[:self._n] if rows is None else self._sqn[rows]
+        d2 = (q * q).sum(1, keepdims=True) + sqn[None, :] - 2.0 * (q @ encs.T)
+        np.maximum(d2, 0.0, out=d2)
+        return np.sqrt(d2)
+
+    def search(self, encs, k=1):
+        """
+        각 쿼리의 top-k (행 번호, 거리) 반환. 둘 다 (m, k) 배열,
+        후보가 k개보다 적으면 행 번호 -1 / 거리 inf로 채운다.
+        """
+        q = np.asarray(encs, dtype=np.float32).reshape(-1, self.dim)
+        m = q.shape[0]
+        idx = np.full((m, k), -1, dtype=np.int64)
+        dist = np.full((m, k), np.inf, dtype=np.float32)
+        with self._lock:
+            if m == 0 or self._n == 0:
+                return idx, dist
+            if self._use_ivf():
+                for i in range(m):
+                    rows = self._probe_rows(q[i])
+                    if rows.size:
+                        self._topk(self._dists(q[i:i + 1], rows), k, idx[i:i + 1], dist[i:i + 1], rows)
+            else:
+                self._topk(self._dists(q), k, idx, dist)
+        return idx, dist
+
+    @staticmethod
+    def _topk(d, k, idx_out, dist_out, rows=None):
+        kk = min(k, d.shape[1])
+        if kk < d.shape[1]:
+            part = np.argpartition(d, kk - 1, axis=1)[:, :kk]
+        else:
+            part = np.broadcast_to(np.arange(d.shape[1]), d.shape)
+        pd = np.take_along_axis(d, part, 1)
+        order = np.argsort(pd, axis=1)
+        part = np.take_along_axis(part, order, 1)
+        idx_out[:, :kk] = part if rows is None else rows[part]
+        dist_out[:, :kk] = np.take_along_axis(pd, order, 1)
+
+    def match(self, encs, thresh, k=1):
+        """
+        프레임의 모든 인코딩을 한 번에 매칭.
+        반환: [(name or "Unknown", dist)] — 최근접 거리가 thresh 이상이면 Unknown
+        """
+        idx, dist = self.search(encs, k)
+        out = []
+        with self._lock:
+            for row, d in zip(idx[:, 0], dist[:, 0]):
+                if row >= 0 and d < thresh:
+                    out.append((self._names[row], float(d)))
+                else:
+                    out.append(("Unknown", float(d)))
+        return out
+
+    # ---------- 분할(IVF) 근사 검색 ----------
+    def _use_ivf(self):
+        """
+        분할이 없거나 학습 이후 IVF_REBUILD_RATIO 넘게 늘었으면 백그라운드 재학습을 걸고,
+        교체될 때까지는 이전 분할(처음이면 전체 정확 검색)을 쓴다 — 검색 스레드는 학습을 기다리지 않음.
+        """
+        if self.mode == "flat":
+            return False
+        if self.mode == "auto" and self._n < IVF_MIN_SIZE:
+            return False
+        if (self._centroids is None or self._n > self._trained_n * (1 + IVF_REBUILD_RATIO)) and not self._building:
+            self._building = True
+            threading.Thread(target=self._build_background, name="gallery-ivf", daemon=True).start()
+        return self._centroids is not None
+
+    def _build_background(self):
+        try:
+            self.build_index()
+        finally:
+            with self._lock:
+                self._building = False
+
+    def build_index(self, nlist=None, iters=10, seed=0):
+        """
+        k-means(nlist ≈ 4·√N)로 분할 학습 후 전체 행 재배정.
+        학습/배정은 잠금 밖에서 스냅샷 복사본으로 하고, 잠금 안에서는 그 사이 바뀐 행만 다시 배정해 교체.
+        """
+        with self._build_lock:
+            with self._lock:
+                n = self._n
+                if n < 2:
+                    return
+                data = np.array(self._encs[:n])
+                self._dirty = set()
+            try:
+                nlist = nlist or max(1, min(n // 8, int(4 * np.sqrt(n))))
+                cent = self._kmeans(data, nlist, iters, np.random.default_rng(seed))
+                assign = self._nearest(data, cent)
+                with self._lock:
+                    full = np.zeros(self._encs.shape[0], dtype=np.int32)
+                    keep = min(n, self._n)
+                    full[:keep] = assign[:keep]
+                    rows = np.array(sorted({r for r in self._dirty if r < self._n} | set(range(n, self._n))),
+                                    dtype=np.int64)
+                    if rows.size:
+                        full[rows] = self._nearest(self._encs[rows], cent)
+                    self._centroids, self._assign = cent, full
+                    self._lists = None
+                    self._trained_n = n
+            finally:
+                with self._lock:
+                    self._dirty = None
+
+    @classmethod
+    def _kmeans(cls, data, nlist, iters, rng):
+        """표본(분할당 최대 64개) k-means — 중심 갱신은 라벨 정렬 + reduceat으로 한 번에"""
+        sample = data[rng.choice(len(data), size=min(len(data), nlist * 64), replace=False)]
+        cent = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iters):
+            lab = cls._nearest(sample, cent)
+            counts = np.bincount(lab, minlength=nlist)
+            nz = counts > 0
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[nz]
+            sums = np.add.reduceat(sample[np.argsort(lab, kind="stable")], starts, axis=0)
+            cent[nz] = sums / counts[nz, None]
+        return cent
+
+    @staticmethod
+    def _nearest(x, cent, block=8192):
+        """행별 가장 가까운 중심 번호 — (block × nlist) 거리 행렬만 만들도록 나눠서"""
+        cn = (cent * cent).sum(1)
+        out = np.empty(len(x), dtype=np.int32)
+        for a in range(0, len(x), block):
+            out[a:a + block] = np.argmin(cn[None, :] - 2.0 * (x[a:a + block] @ cent.T), axis=1)
+        return out
+
+    def _assign_rows(self, a, b):
+        self._assign[a:b] = self._nearest(self._encs[a:b], self._centroids)
+        self._lists = None
+
+    def _probe_rows(self, qv):
+        cent = self._centroids
+        if self._lists is None:
+            assign = self._assign[:self._n]
+            order = np.argsort(assign, kind="stable")
+            bounds = np.searchsorted(assign[order], np.arange(len(cent) + 1))
+            self._lists = [order[bounds[c]:bounds[c + 1]] for c in range(len(cent))]
+        d2 = ((cent - qv[None, :]) ** 2).sum(1)
+        probe = np.argpartition(d2, min(self.nprobe, len(cent)) - 1)[:self.nprobe]
+        return np.concatenate([self._lists[c] for c in probe])
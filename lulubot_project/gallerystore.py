@@ -0,0 +1,237 @@
+# gallerystore.py — 얼굴 갤러리 영속화: 추가 전용 변경 로그 + 주기적 압축 스냅샷 (메모리 맵 float32 행렬)
+import os, json, glob, pickle, struct, threading, zlib
+import numpy as np
+
+from gallery import FaceGallery, ENC_DIM
+
+OPS = {"enroll": 1, "update": 2, "delete": 3}
+_OP_NAMES = {v: k for k, v in OPS.items()}
+_REC = struct.Struct("<II")    # (본문 길이, crc32(본문))
+_BODY = struct.Struct("<BH")   # (op, 이름 바이트 수)
+COMPACT_MIN = 1024             # 로그가 이 개수 이상이고
+COMPACT_RATIO = 0.1            # 갤러리 크기의 이 비율 이상이면 sync()에서 압축
+# 스냅샷 행렬은 N행 + 여유 행으로 기록 — 로그 재생/새 등록이 여유 행(메모리 맵 copy-on-write)에 들어가서
+# 행렬 전체를 메모리로 복사하지 않는다. 여유 = 압축 임계값 이상이므로 압축 전에 바닥나지 않음
+def spare_rows(n):
+    return COMPACT_MIN + int(COMPACT_RATIO * n)
+
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:   # 디렉터리 fsync 미지원(Windows)
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _save_padded(f, a, rows):
+    """(rows, ...) 모양의 .npy로 기록 — 앞 len(a)행은 a, 나머지는 0 (큰 임시 배열을 만들지 않음)"""
+    a = np.ascontiguousarray(a)
+    np.lib.format.write_array_header_1_0(f, {"descr": np.lib.format.dtype_to_descr(a.dtype),
+                                             "fortran_order": False, "shape": (rows,) + a.shape[1:]})
+    f.write(a.tobytes())
+    row = a.itemsize * int(np.prod(a.shape[1:], dtype=np.int64))
+    zero = bytes(min(1 << 20, row * (rows - len(a))))
+    left = row * (rows - len(a))
+    while left > 0:
+        f.write(zero[:left])
+        left -= len(zero)
+
+def _atomic_write(path, write):
+    """임시 파일에 쓰고 fsync 후 rename — 중간에 죽어도 이전 파일 아니면 새 파일만 보인다"""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class GalleryStore:
+    """
+    디렉터리 하나에 세대(gen)별 파일:
+      CURRENT            : 유효한 스냅샷 세대 번호 (rename으로 원자적 교체)
+      snap-<g>.enc.npy   : (N + 여유, 128) float32 인코딩 행렬 — 로드 시 메모리 맵(필요한 페이지만 읽힘)
+      snap-<g>.sqn.npy   : (N + 여유,) 제곱노름 캐시
+      snap-<g>.json      : 행 순서의 이름 목록
+      log-<g>.bin        : 스냅샷 g 이후의 변경 레코드 [len, crc | op, name_len, name, enc(float32×128)]
+    상태 = snap-<CURRENT> + log-<CURRENT> + 그 이후 세대 로그(압축 도중 죽은 경우).
+    등록/수정/삭제는 로그 레코드 하나 추가(O(1)), 끝이 잘린 레코드는 열 때 CRC로 걸러 잘라낸다.
+    """
+    def __init__(self, path, dim=ENC_DIM):
+        self.path = path
+        self.dim = dim
+        self.gallery = None
+        self._lock = threading.Lock()
+        self._gen = 0
+        self._log = None
+        self._log_records = 0
+        self._compacting = False
+        os.makedirs(path, exist_ok=True)
+
+    def _p(self, name):
+        return os.path.join(self.path, name)
+
+    def exists(self):
+        return os.path.exists(self._p("CURRENT")) or bool(glob.glob(self._p("log-*.bin")))
+
+    # ---------- 로드 ----------
+    def load(self, readonly=False, **gallery_kwargs):
+        """
+        스냅샷을 메모리 맵으로 열고 로그를 재생한 갤러리를 반환 (이후 변경은 자동으로 로그에 기록).
+        readonly=True면 파일을 전혀 건드리지 않는다(로그를 열지 않고, 잘린 꼬리도 자르지 않음) —
+        서버가 같은 디렉터리에 쓰는 중에 다른 프로세스(일괄 분석 CLI 등)가 읽을 때.
+        """
+        gen = 0
+        if os.path.exists(self._p("CURRENT")):
+            with open(self._p("CURRENT"), "r", encoding="utf-8") as f:
+                gen = int(f.read().strip() or 0)
+        g = self._load_snapshot(gen, gallery_kwargs)
+
+        logs = sorted(int(os.path.basename(p)[4:-4]) for p in glob.glob(self._p("log-*.bin")))
+        last = gen
+        for k in (k for k in logs if k >= gen):
+            self._replay(g, self._p(f"log-{k}.bin"), truncate=not readonly)
+            last = k
+        if readonly:
+            return g
+        self._gen = last
+        self._open_log()
+        g.on_change = self._append
+        self.gallery = g
+        self._remove_stale(gen)
+        return g
+
+    def _load_snapshot(self, gen, gallery_kwargs):
+        meta = self._p(f"snap-{gen}.json")
+        if not os.path.exists(meta):
+            return FaceGallery(dim=self.dim, **gallery_kwargs)
+        with open(meta, "r", encoding="utf-8") as f:
+            names = json.load(f)["names"]
+        if not names:
+            return FaceGallery(dim=self.dim, **gallery_kwargs)
+        # copy-on-write 매핑: 수정/삭제는 건드린 페이지만 메모리로 복사되고 파일은 그대로
+        encs = np.load(self._p(f"snap-{gen}.enc.npy"), mmap_mode="c")
+        sqn = np.load(self._p(f"snap-{gen}.sqn.npy"), mmap_mode="c")
+        return FaceGallery.from_matrix(names, encs, sqn, dim=self.dim, **gallery_kwargs)
+
+    def _replay(self, g, path, truncate=True):
+        """로그 재생(기록은 끄고). 손상/잘린 꼬리는 마지막 정상 레코드 뒤로 잘라냄"""
+        on_change, g.on_change = g.on_change, None
+        good = 0
+        n = 0
+        with open(path, "rb") as f:
+            data = f.read()
+        while good + _REC.size <= len(data):
+            size, crc = _REC.unpack_from(data, good)
+            body = data[good + _REC.size: good + _REC.size + size]
+            if len(body) != size or zlib.crc32(body) != crc:
+                break
+            op, nlen = _BODY.unpack_from(body)
+            name = body[_BODY.size:_BODY.size + nlen].decode("utf-8")
+            if _OP_NAMES.get(op) == "delete":
+                g.remove(name)
+            else:
+                g.add(name, np.frombuffer(body, dtype=np.float32, count=self.dim, offset=_BODY.size + nlen))
+            good += _REC.size + size
+            n += 1
+        if truncate and good < len(data):
+            with open(path, "r+b") as f:
+                f.truncate(good)
+        g.on_change = on_change
+        self._log_records += n
+
+    # ---------- 기록 ----------
+    def _open_log(self):
+        self._log = open(self._p(f"log-{self._gen}.bin"), "ab")
+
+    def _append(self, op, name, enc):
+        """갤러리 변경 통지(갤러리 잠금 안) → 로그 레코드 1개 추가"""
+        nb = name.encode("utf-8")
+        body = _BODY.pack(OPS[op], len(nb)) + nb
+        if enc is not None:
+            body += np.asarray(enc, dtype=np.float32).tobytes()
+        with self._lock:
+            self._log.write(_REC.pack(len(body), zlib.crc32(body)) + body)
+            self._log_records += 1
+
+    def sync(self):
+        """로그를 디스크에 내림(fsync), 로그가 충분히 길면 백그라운드 압축"""
+        with self._lock:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            due = (not self._compacting and self._log_records >= COMPACT_MIN
+                   and self._log_records >= COMPACT_RATIO * len(self.gallery))
+            if due:
+                self._compacting = True
+        if due:
+            threading.Thread(target=self.compact, name="gallery-compact", daemon=True).start()
+
+    # ---------- 압축 ----------
+    def compact(self):
+        """
+        현재 상태를 새 세대 스냅샷으로 기록. 스냅샷을 뜨는 순간 같은 잠금 안에서 로그도 새 세대로
+        넘기므로, 파일을 쓰는 동안의 변경은 새 로그에 쌓이고 잃어버리지 않는다.
+        """
+        try:
+            def rotate():
+                with self._lock:
+                    self._log.flush()
+                    os.fsync(self._log.fileno())
+                    self._log.close()
+                    self._gen += 1
+                    self._log_records = 0
+                    self._open_log()
+            names, encs, sqn = self.gallery.snapshot(on_taken=rotate)
+            gen = self._gen
+            self._write_snapshot(gen, names, encs, sqn)
+            _atomic_write(self._p("CURRENT"), lambda f: f.write(str(gen).encode()))
+            _fsync_dir(self.path)
+            self._remove_stale(gen)
+        finally:
+            self._compacting = False
+
+    def _write_snapshot(self, gen, names, encs, sqn):
+        rows = len(names) + spare_rows(len(names))
+        _atomic_write(self._p(f"snap-{gen}.enc.npy"),
+                      lambda f: _save_padded(f, encs.astype(np.float32, copy=False), rows))
+        _atomic_write(self._p(f"snap-{gen}.sqn.npy"),
+                      lambda f: _save_padded(f, sqn.astype(np.float32, copy=False), rows))
+        _atomic_write(self._p(f"snap-{gen}.json"),
+                      lambda f: f.write(json.dumps({"names": names}, ensure_ascii=False).encode("utf-8")))
+
+    def _remove_stale(self, gen):
+        """CURRENT보다 오래된 세대 파일 정리 (열려 있는 메모리 맵은 OS가 유지)"""
+        for p in glob.glob(self._p("snap-*")) + glob.glob(self._p("log-*.bin")):
+            base = os.path.basename(p)
+            try:
+                k = int(base.split("-", 1)[1].split(".", 1)[0])
+            except ValueError:
+                continue
+            if k < gen:
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+
+    # ---------- 이전 포맷 ----------
+    def import_pickle(self, pkl_path, **gallery_kwargs):
+        """기존 faces_db.pkl([{name, encoding}])을 읽어 첫 스냅샷으로 기록 후 로드"""
+        with open(pkl_path, "rb") as f:
+            records = pickle.load(f)
+        g = FaceGallery.from_records(records, dim=self.dim, **gallery_kwargs)
+        names, encs, sqn = g.snapshot()
+        self._write_snapshot(1, names, encs, sqn)
+        _atomic_write(self._p("CURRENT"), lambda f: f.write(b"1"))
+        _fsync_dir(self.path)
+        return self.load(**gallery_kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._log:
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self._log.close()
+                self._log = None
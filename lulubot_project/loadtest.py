@@ -0,0 +1,141 @@
+# loadtest.py — 스트림/상태 동시 접속 부하 테스트 (서버 구현별 비교)
+#
+#   python app.py                       # 개발 서버(스레드) :5001
+#   python serve.py --port 5002         # 운영 서버(asyncio)  :5002
+#   python loadtest.py --target dev=http://127.0.0.1:5001 --target async=http://127.0.0.1:5002 \
+#       --streams 10,50,200 --pollers 20 --duration 15 --start
+#
+# 단계마다 MJPEG 시청자 N명을 동시에 붙이고, 그동안 /api/status 폴러가 응답 지연을 잰다.
+# 결과: 연결된 스트림 수, 스트림당 fps(평균/최저), 상태 API p50/p95 지연·실패 수.
+import argparse, asyncio, json, sys, time
+from urllib.parse import urlsplit
+import numpy as np
+
+BOUNDARY = b"--frame\r\n"
+
+
+async def _request(host, port, path, method="GET", timeout=10.0):
+    """HTTP/1.1 요청 1회 → (status, 경과 ms). Connection: close로 본문 끝까지 읽음"""
+    t0 = time.perf_counter()
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        head = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        status = int(head.split()[1]) if head else 0
+        return status, (time.perf_counter() - t0) * 1000.0
+    finally:
+        writer.close()
+
+async def _stream(host, port, path, stop, out):
+    """MJPEG 하나를 끝까지 읽으며 프레임 경계 수를 셈"""
+    frames, tail = 0, b""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), 10.0)
+    except (OSError, asyncio.TimeoutError):
+        out.append(None)
+        return
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+        await writer.drain()
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10.0)
+        if b" 200 " not in head.split(b"\r\n", 1)[0] + b" ":
+            out.append(None)
+            return
+        t0 = time.perf_counter()
+        while not stop.is_set():
+            try:
+                chunk = await asyncio.wait_for(reader.read(65536), 1.0)
+            except asyncio.TimeoutError:
+                continue
+            if not chunk:
+                break
+            buf = tail + chunk
+            frames += buf.count(BOUNDARY)
+            tail = buf[-(len(BOUNDARY) - 1):]
+        out.append(frames / max(1e-6, time.perf_counter() - t0))
+    except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+        out.append(None)
+    finally:
+        writer.close()
+
+async def _poller(host, port, stop, lat, errors):
+    while not stop.is_set():
+        try:
+            status, ms = await _request(host, port, "/api/status")
+            if status in (200, 304):
+                lat.append(ms)
+            else:
+                errors.append(status)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+            errors.append(0)
+        await asyncio.sleep(0.2)
+
+async def run_step(url, streams, pollers, duration, rendition):
+    u = urlsplit(url)
+    host, port = u.hostname, u.port or 80
+    path = "/video_feed" + (f"?r={rendition}" if rendition != "main" else "")
+    stop = asyncio.Event()
+    fps, lat, errors = [], [], []
+    tasks = [asyncio.ensure_future(_stream(host, port, path, stop, fps)) for _ in range(streams)]
+    tasks += [asyncio.ensure_future(_poller(host, port, stop, lat, errors)) for _ in range(pollers)]
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.wait(tasks, timeout=15.0)
+    ok = [f for f in fps if f is not None]
+    return {
+        "streams": streams,
+        "connected": len(ok),
+        "fps_mean": round(float(np.mean(ok)), 2) if ok else 0.0,
+        "fps_min": round(float(np.min(ok)), 2) if ok else 0.0,
+        "status_n": len(lat),
+        "status_p50_ms": round(float(np.percentile(lat, 50)), 1) if lat else None,
+        "status_p95_ms": round(float(np.percentile(lat, 95)), 1) if lat else None,
+        "status_errors": len(errors),
+    }
+
+async def main_async(args):
+    targets = [t.split("=", 1) if "=" in t else (t, t) for t in args.target]
+    results = {}
+    for name, url in targets:
+        u = urlsplit(url)
+        if args.start:
+            await _request(u.hostname, u.port or 80, "/api/start_camera", "POST")
+            await asyncio.sleep(2.0)
+        results[name] = []
+        for n in (int(v) for v in args.streams.split(",")):
+            print(f"[load] {name} streams={n} ...", file=sys.stderr)
+            results[name].append(await run_step(url, n, args.pollers, args.duration, args.rendition))
+            await asyncio.sleep(args.cooldown)
+    return results
+
+def _table(results):
+    cols = ["streams", "connected", "fps_mean", "fps_min", "status_p50_ms", "status_p95_ms", "status_errors"]
+    lines = ["target    " + "  ".join(f"{c:>13}" for c in cols)]
+    for name, steps in results.items():
+        for s in steps:
+            lines.append(f"{name:<9} " + "  ".join(f"{str(s[c]):>13}" for c in cols))
+    return "\n".join(lines)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="LULUBOT 스트림 동시 접속 부하 테스트")
+    ap.add_argument("--target", action="append", required=True, help="이름=URL (여러 번 지정해 비교)")
+    ap.add_argument("--streams", default="10,50,100", help="쉼표 구분 동시 MJPEG 시청자 수 단계")
+    ap.add_argument("--pollers", type=int, default=10, help="동시에 /api/status를 폴링하는 클라이언트 수")
+    ap.add_argument("--duration", type=float, default=10.0, help="단계별 측정 시간(초)")
+    ap.add_argument("--cooldown", type=float, default=2.0)
+    ap.add_argument("--rendition", default="main")
+    ap.add_argument("--start", action="store_true", help="측정 전에 /api/start_camera 호출")
+    ap.add_argument("--out", help="결과 JSON 저장 경로")
+    args = ap.parse_args(argv)
+
+    results = asyncio.run(main_async(args))
+    print(_table(results))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+# metrics.py — 저오버헤드 단계별 지연 히스토그램/카운터 + Prometheus 텍스트 출력 + 샘플링 프로파일러
+import sys, threading, time, traceback
+from bisect import bisect_left
+from collections import Counter as _Tally
+from contextlib import contextmanager
+
+# 초 단위 버킷 (0.5ms ~ 1s)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        if n:
+            with self._lock:
+                self.value += n
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, v):
+        self.value = v
+
+    def inc(self, n=1):
+        with self._lock:
+            self.value += n
+
+    def dec(self, n=1):
+        self.inc(-n)
+
+
+class Histogram:
+    """고정 버킷 히스토그램: observe는 이진 탐색 + 정수 증가 한 번"""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)   # 마지막은 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, v):
+        i = bisect_left(self.bounds, v)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += v
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0)
+
+
+class _Family:
+    def __init__(self, name, kind, help_text, factory):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        key = tuple(sorted(labels.items()))
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._factory())
+        return child
+
+    def render(self, out):
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} {self.kind}")
+        for key, c in sorted(self._children.items()):
+            if self.kind == "histogram":
+                with c._lock:
+                    counts, total, n = list(c.counts), c.sum, c.count
+                acc = 0
+                for bound, k in zip(c.bounds + (float("inf"),), counts):
+                    acc += k
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    out.append(f"{self.name}_bucket{_fmt_labels(key + (('le', le),))} {acc}")
+                out.append(f"{self.name}_sum{_fmt_labels(key)} {total}")
+                out.append(f"{self.name}_count{_fmt_labels(key)} {n}")
+            else:
+                out.append(f"{self.name}{_fmt_labels(key)} {c.value}")
+
+
+class Registry:
+    def __init__(self):
+        self._families = {}
+
+    def _family(self, name, kind, help_text, factory):
+        fam = self._families.get(name)
+        if fam is None:
+            fam = self._families[name] = _Family(name, kind, help_text, factory)
+        return fam
+
+    def counter(self, name, help_text):
+        return self._family(name, "counter", help_text, Counter)
+
+    def gauge(self, name, help_text):
+        return self._family(name, "gauge", help_text, Gauge)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._family(name, "histogram", help_text, lambda: Histogram(buckets))
+
+    def render(self):
+        out = []
+        for fam in self._families.values():
+            fam.render(out)
+        return "\n".join(out) + "\n"
+
+
+# ---------- 기본 레지스트리 / 공용 지표 ----------
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram("lulubot_stage_seconds", "Per-stage latency in seconds")
+FRAMES_CAPTURED = REGISTRY.counter("lulubot_frames_captured_total", "Frames read from the source").labels()
+FRAMES_DROPPED = REGISTRY.counter("lulubot_frames_dropped_total", "Captured frames replaced before rendering").labels()
+READ_FAILURES = REGISTRY.counter("lulubot_camera_read_failures_total", "Failed camera reads").labels()
+DETECT_JOBS = REGISTRY.counter("lulubot_detect_jobs_total", "Detection jobs completed").labels()
+FRAME_ALLOCS = REGISTRY.counter("lulubot_frame_buffer_allocs_total", "Frame buffers allocated (flat once the ring is warm)").labels()
+STREAM_CLIENTS = REGISTRY.gauge("lulubot_stream_clients", "Clients connected to /video_feed")
+STREAM_BYTES = REGISTRY.counter("lulubot_stream_bytes_total", "MJPEG bytes sent to clients")
+
+STAGES = ("capture", "preprocess", "locate", "encode", "match", "emotion", "overlay", "flip", "jpeg")
+_stage = {s: STAGE_SECONDS.labels(stage=s) for s in STAGES}
+
+def stage(name):
+    """with stage("jpeg"): ... — 해당 단계 시간 기록"""
+    return _stage[name].time()
+
+def observe_stage(name, seconds):
+    _stage[name].observe(seconds)
+
+
+class SamplingProfiler:
+    """
+    켜져 있는 동안 interval마다 모든 스레드의 스택을 샘플링해 collapsed-stack 형식으로 집계
+    (flamegraph.pl / speedscope에 그대로 넣을 수 있음). 꺼져 있으면 비용 0.
+    """
+    def __init__(self):
+        self.interval = 0.01
+        self.samples = _Tally()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms=10):
+        if self.running:
+            return
+        self.interval = max(0.001, interval_ms / 1000.0)
+        self.samples.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for t in threading.enumerate():
+                names[t.ident] = t.name
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = [f"{fs.name} ({fs.filename.rsplit('/', 1)[-1]}:{fs.lineno})"
+                         for fs in traceback.extract_stack(frame)]
+                self.samples[";".join([names.get(tid, str(tid))] + stack)] += 1
+
+    def collapsed(self):
+        return "\n".join(f"{k} {v}" for k, v in self.samples.most_common()) + "\n"
+
+
+PROFILER = SamplingProfiler()
@@ -0,0 +1,36 @@
+# overlay.py — 송출 프레임 오버레이(얼굴 박스/라벨 + 상단 상태 텍스트)
+import cv2
+
+
+def overlay_status(base_frame, text_lines, org=(12, 28)):
+    x, y = org
+    for i, line in enumerate(text_lines):
+        yy = y + i * 24
+        cv2.putText(base_frame, line, (x, yy), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 4, cv2.LINE_AA)
+        cv2.putText(base_frame, line, (x, yy), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2, cv2.LINE_AA)
+
+def draw_faces(draw, faces, engine_name, known_count):
+    """
+    faces: [(box(top,right,bottom,left), name, label, conf)] — draw에 직접 그림
+    """
+    # 오버레이(얼굴 박스/라벨)
+    for (t, r, b, l), name, label, conf in faces:
+        cv2.rectangle(draw, (l, t), (r, b), (0, 255, 0), 2)
+        lbl = name if name else "Unknown"
+        if label is not None:
+            lbl = f"{lbl} | {label} {int(conf * 100)}%"
+        cv2.rectangle(draw, (l, b - 22), (r, b), (0, 255, 0), -1)
+        cv2.putText(draw, lbl, (l + 4, b - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1, cv2.LINE_AA)
+
+    # 상단 상태 텍스트
+    if len(faces) == 0:
+        header = [f"얼굴 미검출 · 엔진:{engine_name}"]
+        if known_count == 0:
+            header.append("등록자 없음 — 감정만 표시 모드")
+    else:
+        _, who_txt, top_label, top_conf = faces[0]
+        emo_txt = f"{top_label} ({int(top_conf * 100)}%)" if top_label else "분석중"
+        header = [f"{who_txt} | {emo_txt}  ·  얼굴:{len(faces)} · 엔진:{engine_name}"]
+
+    overlay_status(draw, header)
+    return draw
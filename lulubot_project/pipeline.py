@@ -0,0 +1,360 @@
+# pipeline.py — 캡처 / 검출 / 렌더 단계 분리 파이프라인
+import os, time, threading, traceback
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import cv2
+import numpy as np
+
+from tracker import iou
+from scheduler import DetectScheduler
+from framering import FrameRing
+import metrics
+
+
+def detect_job(crops, model="hog", skip_boxes=(), skip_iou=0.5):
+    """
+    워커 프로세스에서 실행: HOG 검출 + 128D 인코딩
+    (dlib 연산이 GIL 밖의 별도 프로세스에서 돌기 때문에 코어 수만큼 병렬화됨)
+    crops: [(oy, ox, rgb_small)] — 축소 좌표계 기준 오프셋과 축소된 영역(전체 프레임이면 1개)
+    skip_boxes(이미 신원이 확정된 트랙)와 겹치는 얼굴은 인코딩을 생략하고 None을 돌려준다.
+    반환: (축소 좌표계 boxes, encs, 단계별 시간(초) {"locate", "encode"})
+    """
+    import face_recognition  # 워커마다 최초 1회만 로드
+    timing = {"locate": 0.0, "encode": 0.0}
+    boxes, encs = [], []
+    for oy, ox, rgb in crops:
+        t0 = time.perf_counter()
+        local = face_recognition.face_locations(rgb, model=model)
+        t1 = time.perf_counter()
+        shifted = [(t + oy, r + ox, b + oy, l + ox) for (t, r, b, l) in local]
+        need = [i for i, b in enumerate(shifted)
+                if not any(iou(b, s) >= skip_iou for s in skip_boxes)]
+        out = [None] * len(local)
+        if need:
+            for i, enc in zip(need, face_recognition.face_encodings(rgb, [local[i] for i in need])):
+                out[i] = enc
+        timing["locate"] += t1 - t0
+        timing["encode"] += time.perf_counter() - t1
+        boxes += shifted
+        encs += out
+    return boxes, encs, timing
+
+
+# ---------- 검출 워커 풀(프로세스 전체에서 공유) ----------
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def default_workers():
+    # 캡처/렌더/Flask 스레드 몫으로 코어 1개는 남겨둔다
+    return max(1, (os.cpu_count() or 2) - 1)
+
+def get_pool(workers=None):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            _pool_workers = workers or default_workers()
+            _pool = ProcessPoolExecutor(max_workers=_pool_workers)
+        return _pool
+
+def pool_workers():
+    return _pool_workers or default_workers()
+
+def warm_job(rgb):
+    """워커 예열: face_recognition/dlib 모델 적재 + 검출/인코딩 1회 (첫 실제 프레임이 이 비용을 내지 않게)"""
+    import face_recognition
+    h, w = rgb.shape[:2]
+    face_recognition.face_locations(rgb, model="hog")
+    face_recognition.face_encodings(rgb, [(h // 4, w * 3 // 4, h * 3 // 4, w // 4)])
+    return os.getpid()
+
+def warm_pool(workers=None, rgb=None):
+    """워커 프로세스를 모두 띄우고 각각 예열 (rgb: 예열용 프레임, 기본은 빈 프레임)"""
+    pool = get_pool(workers)
+    if rgb is None:
+        rgb = np.zeros((240, 320, 3), dtype=np.uint8)
+    futs = [pool.submit(warm_job, rgb) for _ in range(pool_workers())]
+    return len({f.result() for f in futs})
+
+def shutdown_pool():
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool, _pool_workers = None, 0
+
+
+class FairShare:
+    """
+    여러 카메라(와 일괄 등록 작업)가 워커 풀 하나를 나눠 쓸 때의 참여자별 동시 작업 상한.
+    워커 수를 동작 중인 파이프라인 수로 나눈 몫(올림)만큼만 제출하게 해서
+    검출이 바쁜 카메라 하나가 풀 큐를 독차지하지 못하게 한다.
+    """
+    def __init__(self):
+        self._n = 0
+        self._lock = threading.Lock()
+
+    def join(self):
+        with self._lock:
+            self._n += 1
+
+    def leave(self):
+        with self._lock:
+            self._n = max(0, self._n - 1)
+
+    def quota(self, workers):
+        return max(1, -(-workers // max(1, self._n)))
+
+fair_share = FairShare()
+
+
+class LatestQueue:
+    """
+    크기 제한 큐(latest-wins). 가득 차면 가장 오래된 항목을 버리고,
+    get()은 가장 최신 항목만 돌려주며 나머지는 버린다.
+    on_drop(item)은 버려지는 항목마다 호출된다(프레임 버퍼 반납용).
+    """
+    def __init__(self, maxsize=1, drop_counter=None, on_drop=None):
+        self._q = deque(maxlen=maxsize)
+        self._cv = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+        self._drop_counter = drop_counter
+        self._on_drop = on_drop
+
+    def _drop(self, items):
+        self.dropped += len(items)
+        if self._drop_counter:
+            self._drop_counter.inc(len(items))
+        if self._on_drop:
+            for item in items:
+                self._on_drop(item)
+
+    def put(self, item):
+        with self._cv:
+            if len(self._q) == self._q.maxlen:
+                self._drop([self._q.popleft()])
+            self._q.append(item)
+            self._cv.notify_all()
+
+    def get(self, timeout=None):
+        """최신 항목 반환. timeout 내에 없거나 닫혔으면 None"""
+        with self._cv:
+            if not self._cv.wait_for(lambda: self._q or self._closed, timeout):
+                return None
+            if not self._q:
+                return None
+            item = self._q.pop()
+            self._drop(list(self._q))
+            self._q.clear()
+            return item
+
+    def close(self):
+        with self._cv:
+            self._closed = True
+            self._drop(list(self._q))
+            self._q.clear()
+            self._cv.notify_all()
+
+
+class CameraPipeline:
+    """
+    capture 스레드 : cap.read()만 수행해서 최신 프레임 큐에 넣음 (검출 지연과 무관하게 FPS 유지)
+    detect 스레드  : 최신 프레임을 축소해 프로세스 풀에 제출, 완료되면 on_detect(frame, boxes, encs)
+    render 스레드  : 최신 프레임 + 최신 검출 결과로 on_render(frame, result)
+
+    on_detect 반환값이 "최신 결과"로 보관되어 이후 렌더 프레임마다 합성된다.
+    boxes는 원본 해상도 기준 (top, right, bottom, left)로 변환되어 전달된다.
+    skip_boxes()가 돌려준 박스(원본 좌표)와 겹치는 얼굴은 encs가 None으로 온다.
+    검출 주기/축소 비율/ROI는 scheduler(DetectScheduler)가 정하며, known_boxes()는
+    ROI 제한 검색에 쓸 현재 얼굴 박스(원본 좌표)를 돌려준다.
+
+    프레임은 FrameRing 버퍼에 직접 읽어 들이고(cap.read(image)), 단계 사이에는 참조만 넘긴다.
+    콜백에 전달된 frame은 콜백이 끝나면 재사용되므로 밖에 붙잡아 두려면 hold_latest()를 쓴다.
+    """
+    def __init__(self, cap, on_detect, on_render, on_error=None, on_stop=None, skip_boxes=None,
+                 known_boxes=None, scheduler=None, scale=0.25, detect_every_n=5, model="hog", workers=None,
+                 ring_size=None):
+        self.cap = cap
+        self.on_detect = on_detect
+        self.on_render = on_render
+        self.skip_boxes = skip_boxes or (lambda: [])
+        self.known_boxes = known_boxes or (lambda: [])
+        self.on_error = on_error or (lambda msg: None)
+        self.on_stop = on_stop
+        self.scheduler = scheduler or DetectScheduler(every_n=detect_every_n, scale=scale, adaptive=False)
+        self.model = model
+        self.workers = workers or pool_workers()
+
+        self.running = False
+        self.seq = 0
+        self.result = None        # 최신 검출 결과(on_detect 반환값)
+        self.result_seq = -1      # 그 결과가 나온 프레임 번호
+        # 동시에 살아 있는 프레임: 큐 2 + 검출 중(workers) + 렌더 중/최신 보관 + 캡처 중 + 여유
+        self.ring = FrameRing(ring_size or self.workers + 6)
+        release = lambda item: item[1].release()
+        self._detect_q = LatestQueue(1, on_drop=release)
+        self._render_q = LatestQueue(1, drop_counter=metrics.FRAMES_DROPPED, on_drop=release)  # 렌더 못 하고 버린 프레임
+        self._latest = None       # 마지막 렌더 프레임(Frame) — 등록 등에서 복사 없이 참조
+        self._latest_lock = threading.Lock()
+        self._threads = []
+
+    # ---------- 수명주기 ----------
+    def start(self):
+        get_pool(self.workers)  # 워커 미리 띄우기
+        fair_share.join()
+        self.running = True
+        for name, target in (("capture", self._capture_loop),
+                             ("detect", self._detect_loop),
+                             ("render", self._render_loop)):
+            t = threading.Thread(target=target, name=f"pipeline-{name}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self.running = False
+        self._detect_q.close()
+        self._render_q.close()
+
+    @property
+    def dropped(self):
+        return self._detect_q.dropped + self._render_q.dropped
+
+    @contextmanager
+    def hold_latest(self):
+        """with pipe.hold_latest() as frame: — 마지막 렌더 원본 프레임(없으면 None)을 블록 동안 붙잡음"""
+        with self._latest_lock:
+            f = self._latest.retain() if self._latest is not None else None
+        try:
+            yield f.data if f is not None else None
+        finally:
+            if f is not None:
+                f.release()
+
+    def _set_latest(self, frame):
+        with self._latest_lock:
+            prev, self._latest = self._latest, frame
+        if prev is not None:
+            prev.release()
+
+    # ---------- 단계 ----------
+    def _capture_loop(self):
+        try:
+            while self.running and self.cap and self.cap.isOpened():
+                with metrics.stage("capture"):
+                    frame = self.ring.acquire(self.ring.shape) if self.ring.shape else None
+                    ok, img = self.cap.read(frame.data) if frame is not None else self.cap.read()
+                if not ok:
+                    if frame is not None:
+                        frame.release()
+                    metrics.READ_FAILURES.inc()
+                    self.on_error("camera read fail")
+                    time.sleep(0.02)
+                    continue
+                if frame is None or img.ctypes.data != frame.data.ctypes.data:
+                    # 첫 프레임 / 해상도 변경 / 버퍼를 못 받는 소스 → 받은 배열을 그대로 감쌈
+                    if frame is not None:
+                        frame.release()
+                    frame = self.ring.wrap(img)
+                metrics.FRAMES_CAPTURED.inc()
+                self.seq += 1
+                self.scheduler.frame_tick()
+                self._detect_q.put((self.seq, frame.retain()))
+                self._render_q.put((self.seq, frame.retain()))
+                frame.release()
+        except Exception as e:
+            self.on_error(f"capture crashed: {e}")
+            traceback.print_exc()
+        finally:
+            self.stop()
+            self._set_latest(None)
+            fair_share.leave()
+            try:
+                self.cap.release()
+            except Exception:
+                pass
+            if self.on_stop:
+                self.on_stop()
+
+    @staticmethod
+    def _to_full(boxes, scale):
+        k = 1.0 / scale
+        return [tuple(int(round(v * k)) for v in b) for b in boxes]
+
+    def _crops(self, frame, scale, rois):
+        crops = []
+        for (t, r, b, l) in rois:
+            region = frame[t:b, l:r]
+            if region.size == 0:
+                continue
+            small = cv2.resize(region, (0, 0), fx=scale, fy=scale)
+            crops.append((t * scale, l * scale, cv2.cvtColor(small, cv2.COLOR_BGR2RGB)))
+        return crops
+
+    def _collect(self, inflight, timeout):
+        done, _ = wait(list(inflight), timeout=timeout, return_when=FIRST_COMPLETED)
+        for fut in sorted(done, key=lambda f: inflight[f][0]):
+            seq, frame, scale, full = inflight.pop(fut)
+            try:
+                boxes, encs, timing = fut.result()
+                metrics.DETECT_JOBS.inc()
+                for name, sec in timing.items():
+                    metrics.observe_stage(name, sec)
+                self.scheduler.observe(sum(timing.values()) * 1000.0, full, fair_share.quota(self.workers))
+                if seq <= self.result_seq:
+                    continue  # 더 최신 프레임 결과가 이미 반영됨
+                self.result = self.on_detect(frame.data, self._to_full(boxes, scale), encs)
+                self.result_seq = seq
+            except Exception as e:
+                self.on_error(f"detect/predict error: {e}")
+            finally:
+                frame.release()
+
+    def _detect_loop(self):
+        inflight = {}  # future -> (seq, frame, scale, full)
+        while self.running:
+            try:
+                quota = fair_share.quota(self.workers)  # 다른 카메라와 나눠 쓰는 동시 작업 상한
+                if inflight:
+                    full = len(inflight) >= quota
+                    self._collect(inflight, timeout=0.05 if full else 0)
+                    if len(inflight) >= quota:
+                        continue
+                item = self._detect_q.get(timeout=0.05)
+                if item is None:
+                    continue
+                seq, frame = item
+                try:
+                    plan = self.scheduler.plan(seq, frame.data.shape, self.known_boxes())
+                    if plan is None:
+                        frame.release()
+                        continue
+                    scale, rois, full = plan
+                    with metrics.stage("preprocess"):
+                        crops = self._crops(frame.data, scale, rois)
+                    skip = [tuple(v * scale for v in b) for b in self.skip_boxes()]
+                    fut = get_pool().submit(detect_job, crops, self.model, skip)
+                except Exception:
+                    frame.release()
+                    raise
+                inflight[fut] = (seq, frame, scale, full)  # 결과 반영 후 _collect에서 반납
+            except Exception as e:
+                self.on_error(f"detect dispatch error: {e}")
+                time.sleep(0.1)
+        for fut, (_, frame, _, _) in inflight.items():
+            fut.cancel()
+            frame.release()
+
+    def _render_loop(self):
+        while self.running:
+            item = self._render_q.get(timeout=0.1)
+            if item is None:
+                continue
+            _, frame = item
+            try:
+                self.on_render(frame.data, self.result)
+            except Exception as e:
+                self.on_error(f"render error: {e}")
+            self._set_latest(frame)  # 렌더 큐에서 받은 참조를 최신 프레임 보관용으로 넘김
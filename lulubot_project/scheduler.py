@@ -0,0 +1,146 @@
+# scheduler.py — 지연/CPU 예산 기반 검출 주기·축소 비율 조정 + ROI 제한 검색
+import threading, time
+
+SCALES = (0.125, 0.167, 0.2, 0.25, 0.333, 0.5)  # 검출용 축소 비율 후보(작을수록 빠름)
+
+
+def _merge(rects):
+    """겹치는 (top, right, bottom, left) 사각형을 합집합으로 병합"""
+    rects = list(rects)
+    merged = True
+    while merged:
+        merged = False
+        out = []
+        for r in rects:
+            for i, o in enumerate(out):
+                if r[0] < o[2] and o[0] < r[2] and r[3] < o[1] and o[3] < r[1]:
+                    out[i] = (min(r[0], o[0]), max(r[1], o[1]), max(r[2], o[2]), min(r[3], o[3]))
+                    merged = True
+                    break
+            else:
+                out.append(r)
+        rects = out
+    return rects
+
+
+class DetectScheduler:
+    """
+    측정된 단계 시간으로 검출 주기(every_n)와 축소 비율(scale)을 조정한다.
+      - 전체 프레임 검출 1회 지연이 latency_budget_ms를 넘으면 scale↓
+      - 워커 점유율(검출시간 / (주기 × 프레임간격 × 워커수))이 cpu_budget을 넘으면 every_n↑ (한계면 scale↓)
+      - 여유가 충분하면 every_n↓ → scale↑ 순으로 반응 속도를 올림
+    얼굴이 이미 있으면 마지막 박스 주변(roi_pad 배 여백)만 검색하고,
+    full_sweep_sec마다 한 번은 전체 프레임을 훑어 새 얼굴을 잡는다.
+    """
+    def __init__(self, every_n=5, scale=0.25, adaptive=True, latency_budget_ms=150.0, cpu_budget=0.75,
+                 min_every=1, max_every=15, full_sweep_sec=1.0, roi_pad=0.6, adjust_sec=0.5):
+        self.every_n = every_n
+        self.scale_idx = min(range(len(SCALES)), key=lambda i: abs(SCALES[i] - scale))
+        self.adaptive = adaptive
+        self.latency_budget_ms = latency_budget_ms
+        self.cpu_budget = cpu_budget
+        self.min_every = min_every
+        self.max_every = max_every
+        self.full_sweep_sec = full_sweep_sec
+        self.roi_pad = roi_pad
+        self.adjust_sec = adjust_sec
+
+        self._lock = threading.Lock()
+        self._last_seq = -10**9
+        self._last_full = 0.0
+        self._last_adjust = 0.0
+        self._last_frame_t = None
+        self.frame_ms = 33.0     # 프레임 간격 EMA
+        self.det_ms = None       # 검출 작업 시간 EMA(ROI 포함)
+        self.full_ms = None      # 전체 프레임 검출 시간 EMA
+
+    @property
+    def scale(self):
+        return SCALES[self.scale_idx]
+
+    # ---------- 측정 ----------
+    def frame_tick(self, now=None):
+        """캡처 단계에서 프레임마다 호출"""
+        now = now or time.time()
+        if self._last_frame_t is not None:
+            dt = (now - self._last_frame_t) * 1000.0
+            if 0 < dt < 1000:
+                self.frame_ms = 0.9 * self.frame_ms + 0.1 * dt
+        self._last_frame_t = now
+
+    def observe(self, ms, full, workers=1, now=None):
+        """검출 작업 완료 시 호출 (ms: 워커에서 잰 작업 시간, full: 전체 프레임 검색 여부)"""
+        now = now or time.time()
+        with self._lock:
+            self.det_ms = ms if self.det_ms is None else 0.8 * self.det_ms + 0.2 * ms
+            if full:
+                self.full_ms = ms if self.full_ms is None else 0.8 * self.full_ms + 0.2 * ms
+            if self.adaptive and now - self._last_adjust >= self.adjust_sec:
+                self._last_adjust = now
+                self._adjust(workers)
+
+    def _adjust(self, workers):
+        load = self.det_ms / (self.every_n * self.frame_ms * max(1, workers))
+        full_ms = self.full_ms if self.full_ms is not None else self.det_ms
+        if full_ms > self.latency_budget_ms and self.scale_idx > 0:
+            self._rescale(-1)
+        elif load > self.cpu_budget:
+            if self.every_n < self.max_every:
+                self.every_n += 1
+            elif self.scale_idx > 0:
+                self._rescale(-1)
+        elif load < self.cpu_budget * 0.5:
+            if self.every_n > self.min_every:
+                self.every_n -= 1
+            elif self.scale_idx < len(SCALES) - 1:
+                # HOG 비용 ∝ 픽셀 수 ∝ scale² 로 다음 단계 지연을 추정
+                nxt = (SCALES[self.scale_idx + 1] / self.scale) ** 2
+                if full_ms * nxt < self.latency_budget_ms * 0.8:
+                    self._rescale(+1)
+
+    def _rescale(self, step):
+        ratio = (SCALES[self.scale_idx + step] / self.scale) ** 2
+        self.scale_idx += step
+        # 새 비율의 측정값이 쌓일 때까지 추정치로 대체(진동 방지)
+        if self.full_ms is not None:
+            self.full_ms *= ratio
+        if self.det_ms is not None:
+            self.det_ms *= ratio
+
+    # ---------- 계획 ----------
+    def plan(self, seq, frame_shape, known_boxes=(), now=None):
+        """
+        이번 프레임에 검출할지 결정. 안 하면 None,
+        하면 (scale, rois, full) — rois는 원본 좌표 (top, right, bottom, left) 목록
+        """
+        now = now or time.time()
+        with self._lock:
+            if seq - self._last_seq < self.every_n:
+                return None
+            self._last_seq = seq
+            h, w = frame_shape[:2]
+            whole = [(0, w, h, 0)]
+            if not known_boxes or now - self._last_full >= self.full_sweep_sec:
+                self._last_full = now
+                return self.scale, whole, True
+
+            rois = []
+            for (t, r, b, l) in known_boxes:
+                px, py = int((r - l) * self.roi_pad), int((b - t) * self.roi_pad)
+                rois.append((max(0, t - py), min(w, r + px), min(h, b + py), max(0, l - px)))
+            rois = _merge(rois)
+            area = sum((r - l) * (b - t) for (t, r, b, l) in rois)
+            if area > 0.6 * w * h:  # ROI가 화면 대부분이면 그냥 전체 검색
+                self._last_full = now
+                return self.scale, whole, True
+            return self.scale, rois, False
+
+    def stats(self):
+        return {
+            "every_n": self.every_n,
+            "scale": self.scale,
+            "frame_ms": round(self.frame_ms, 1),
+            "detect_ms": round(self.det_ms, 1) if self.det_ms is not None else None,
+            "full_ms": round(self.full_ms, 1) if self.full_ms is not None else None,
+            "adaptive": self.adaptive,
+        }
@@ -0,0 +1,235 @@
+# serve.py — 운영용 진입점: 스트림(/video_feed, /api/events)은 asyncio 이벤트 루프에서, 나머지 JSON API는 Flask(WSGI 스레드 풀)로
+#
+#   pip install uvicorn a2wsgi
+#   python serve.py --host 0.0.0.0 --port 5001
+#
+# 개발 서버(app.py의 app.run)는 시청자 1명당 스레드 1개가 gen_mjpeg 안에서 블록된다.
+# 여기서는 카메라·렌디션마다 펌프 스레드 1개가 브로드캐스터에서 인코딩된 JPEG를 받아 루프로 넘기고,
+# 클라이언트는 전부 코루틴이라 수백 명이 붙어도 스레드 수가 늘지 않는다. 검출/인코딩 같은 CPU 작업은
+# 기존 파이프라인 스레드와 프로세스 풀에 그대로 남는다.
+import argparse, asyncio, json, threading, time
+from urllib.parse import parse_qs
+
+import metrics
+
+MAX_CLIENTS = 1000        # 스트림(MJPEG + SSE) 동시 접속 상한 — 넘으면 503
+SEND_TIMEOUT_SEC = 10.0   # 한 조각을 이만큼 못 보내는 클라이언트는 끊음
+WSGI_THREADS = 16         # JSON API용 스레드 (스트림은 여기서 돌지 않음)
+
+
+class _Hub:
+    """
+    카메라 1대의 한 채널(렌디션 JPEG 또는 상태 스냅샷)을 이벤트 루프로 옮기는 펌프 스레드 + 구독자 알림.
+    구독자가 있을 때만 스레드가 돌고, 최신 값 하나만 들고 있어서 구독자 수와 무관하게 메모리가 일정하다.
+    """
+    def __init__(self, loop, name, pull):
+        self.loop = loop
+        self.name = name
+        self.pull = pull          # pull(seq) -> (seq, value or None), 최대 1초 블록
+        self.seq = 0
+        self.value = None
+        self.event = asyncio.Event()
+        self.clients = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def acquire(self):
+        with self._lock:
+            self.clients += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._pump, name=f"hub-{self.name}", daemon=True)
+                self._thread.start()
+
+    def release(self):
+        with self._lock:
+            self.clients -= 1
+
+    def _pump(self):
+        seq = self.seq
+        while True:
+            with self._lock:
+                if self.clients <= 0:
+                    self._thread = None
+                    return
+            try:
+                seq, value = self.pull(seq)
+            except Exception:
+                time.sleep(0.5)
+                continue
+            if value is not None:
+                self.loop.call_soon_threadsafe(self._post, seq, value)
+            else:
+                time.sleep(0.05)   # 카메라 정지 시 즉시 반환되는 wait에서 헛돌지 않게
+
+    def _post(self, seq, value):
+        self.seq, self.value = seq, value
+        ev, self.event = self.event, asyncio.Event()
+        ev.set()
+
+    async def next(self, after, timeout):
+        """after보다 새 값이 올 때까지 대기 → (seq, value), timeout이면 (after, None)"""
+        if self.seq <= after:
+            try:
+                await asyncio.wait_for(self.event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return after, None
+        return self.seq, self.value
+
+
+class StreamServer:
+    """
+    ASGI 앱. /video_feed[/<id>], /api/events[/<id>]는 코루틴으로 직접 처리하고 나머지는 Flask로 넘긴다.
+    per-client 백프레셔: send()는 전송 버퍼가 차면 대기하고(서버의 흐름 제어), 그동안 들어온 프레임은
+    쌓지 않고 건너뛰어 다음 전송 때 최신 것만 보낸다. SEND_TIMEOUT_SEC 넘게 막히면 연결을 끊는다.
+    """
+    def __init__(self, wsgi_app, get_camera, keepalive_sec=15.0, max_clients=MAX_CLIENTS, wsgi_threads=WSGI_THREADS):
+        from a2wsgi import WSGIMiddleware
+        self.wsgi = WSGIMiddleware(wsgi_app, workers=wsgi_threads)
+        self.get_camera = get_camera
+        self.keepalive_sec = keepalive_sec
+        self.max_clients = max_clients
+        self.active = 0
+        self._hubs = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                msg = await receive()
+                if msg["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif msg["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] == "http":
+            parts = scope["path"].strip("/").split("/")
+            if parts[0] == "video_feed" and len(parts) <= 2:
+                return await self._stream(scope, receive, send, parts[1] if len(parts) == 2 else None, self._mjpeg)
+            if parts[:2] == ["api", "events"] and len(parts) <= 3:
+                return await self._stream(scope, receive, send, parts[2] if len(parts) == 3 else None, self._sse)
+        return await self.wsgi(scope, receive, send)
+
+    # ---------- 공통 ----------
+    @staticmethod
+    async def _json(send, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(data)).encode())]})
+        await send({"type": "http.response.body", "body": data})
+
+    def _hub(self, key, pull):
+        hub = self._hubs.get(key)
+        if hub is None:
+            hub = self._hubs[key] = _Hub(asyncio.get_running_loop(), "-".join(key), pull)
+        return hub
+
+    async def _stream(self, scope, receive, send, cam_id, handler):
+        cam = self.get_camera(cam_id)
+        if cam is None:
+            return await self._json(send, 404, {"ok": False, "error": f"unknown camera: {cam_id}"})
+        if self.active >= self.max_clients:
+            return await self._json(send, 503, {"ok": False, "error": "too many stream clients"})
+        disconnected = asyncio.Event()
+
+        async def watch():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        watcher = asyncio.ensure_future(watch())
+        self.active += 1
+        try:
+            await handler(scope, send, cam, disconnected)
+        except (asyncio.TimeoutError, OSError):
+            pass   # 느린/끊긴 클라이언트
+        finally:
+            self.active -= 1
+            watcher.cancel()
+
+    # ---------- MJPEG ----------
+    async def _mjpeg(self, scope, send, cam, disconnected):
+        rendition = parse_qs(scope.get("query_string", b"").decode()).get("r", ["main"])[0]
+        if not cam.running:
+            return await self._json(send, 409, {"error": "camera not started"})
+        if rendition not in cam.broadcaster.renditions:
+            return await self._json(send, 400, {"error": f"unknown rendition: {rendition}"})
+        hub = self._hub((cam.id, rendition), lambda seq: cam.broadcaster.wait(rendition, seq, timeout=1.0))
+        clients = metrics.STREAM_CLIENTS.labels(rendition=rendition)
+        sent = metrics.STREAM_BYTES.labels(rendition=rendition)
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"multipart/x-mixed-replace; boundary=frame"),
+                                (b"cache-control", b"no-cache")]})
+        hub.acquire()
+        clients.inc()
+        try:
+            seq = 0
+            while cam.running and not disconnected.is_set():
+                seq, part = await hub.next(seq, timeout=1.0)
+                if part is None:
+                    continue
+                await asyncio.wait_for(send({"type": "http.response.body", "body": part, "more_body": True}),
+                                       SEND_TIMEOUT_SEC)
+                sent.inc(len(part))
+        finally:
+            hub.release()
+            clients.dec()
+        if not disconnected.is_set():
+            await send({"type": "http.response.body", "body": b""})
+
+    # ---------- SSE ----------
+    @staticmethod
+    def _pull_state(cam):
+        def pull(tick):
+            with cam.state_cv:
+                cam.state_cv.wait_for(lambda: cam.state["tick"] != tick, timeout=1.0)
+                if cam.state["tick"] == tick:
+                    return tick, None
+                return cam.state["tick"], cam.event_snapshot()
+        return pull
+
+    async def _sse(self, scope, send, cam, disconnected):
+        hub = self._hub((cam.id, "events"), self._pull_state(cam))
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"),
+                                (b"x-accel-buffering", b"no")]})
+        hub.acquire()
+        try:
+            snap = cam.event_snapshot()   # 첫 메시지는 전체
+            tick, sent = snap["tick"], {}
+            idle = time.monotonic()
+            while not disconnected.is_set():
+                if snap is not None:
+                    delta = {k: v for k, v in snap.items() if k not in sent or sent[k] != v}
+                    if len(delta) > 1 or "tick" not in sent:   # tick 외에 바뀐 게 있을 때만
+                        sent.update(delta)
+                        body = f"id: {tick}\ndata: {json.dumps(delta, ensure_ascii=False)}\n\n".encode("utf-8")
+                        await asyncio.wait_for(send({"type": "http.response.body", "body": body, "more_body": True}),
+                                               SEND_TIMEOUT_SEC)
+                        idle = time.monotonic()
+                if time.monotonic() - idle >= self.keepalive_sec:
+                    await asyncio.wait_for(send({"type": "http.response.body", "body": b": keepalive\n\n",
+                                                 "more_body": True}), SEND_TIMEOUT_SEC)
+                    idle = time.monotonic()
+                tick, snap = await hub.next(tick, timeout=1.0)
+        finally:
+            hub.release()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="LULUBOT 운영 서버 (uvicorn + asyncio 스트림)")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=5001)
+    ap.add_argument("--max-clients", type=int, default=MAX_CLIENTS)
+    ap.add_argument("--wsgi-threads", type=int, default=WSGI_THREADS)
+    args = ap.parse_args(argv)
+
+    import uvicorn
+    import app as lulu   # import 시 초기화 스레드 시작
+
+    server = StreamServer(lulu.app, lambda cid: lulu.cameras.get(cid or lulu.DEFAULT_CAMERA),
+                          keepalive_sec=lulu.EVENTS_KEEPALIVE_SEC, max_clients=args.max_clients,
+                          wsgi_threads=args.wsgi_threads)
+    # 워커 프로세스 1개(카메라/갤러리/풀은 프로세스 안에서 공유되므로 uvicorn --workers로 늘리지 않음)
+    uvicorn.run(server, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# sources.py — 프레임 소스 추상화 (웹캠 / 동영상 파일 / 이미지 폴더 / 합성 프레임)
+# 모든 소스는 cv2.VideoCapture와 같은 isOpened() / read(image=None) / release() 인터페이스를 따른다.
+# read(image)에 같은 크기의 버퍼를 주면 새 배열을 만들지 않고 거기에 채워서 돌려준다.
+import os, glob, time
+import numpy as np
+import cv2
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class _Pacer:
+    """fps가 주어지면 read() 간격을 실시간처럼 맞춤 (0이면 최대 속도)"""
+    def __init__(self, fps):
+        self.dt = 1.0 / fps if fps else 0.0
+        self.next_t = None
+
+    def wait(self):
+        if not self.dt:
+            return
+        now = time.perf_counter()
+        if self.next_t is None:
+            self.next_t = now
+        if self.next_t > now:
+            time.sleep(self.next_t - now)
+        self.next_t = max(self.next_t + self.dt, now - self.dt)
+
+
+class VideoFileSource:
+    """동영상 파일 재생. loop=True면 끝에서 처음으로, fps>0이면 실시간 속도로 재생"""
+    def __init__(self, path, loop=True, fps=0):
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        self._pacer = _Pacer(fps)
+
+    def isOpened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def read(self, image=None):
+        self._pacer.wait()
+        ok, frame = self.cap.read(image)
+        if not ok and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.cap.read(image)
+        return ok, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class ImageDirSource:
+    """폴더 안 이미지를 이름순으로 반복 재생 (size=(w,h)면 크기 통일)"""
+    def __init__(self, path, loop=True, fps=0, size=None):
+        self.files = sorted(f for f in glob.glob(os.path.join(path, "*")) if f.lower().endswith(IMAGE_EXTS))
+        self.loop = loop
+        self.size = size
+        self._i = 0
+        self._pacer = _Pacer(fps)
+        self._open = bool(self.files)
+
+    def isOpened(self):
+        return self._open
+
+    def read(self, image=None):
+        while self._open:
+            if self._i >= len(self.files):
+                if not self.loop:
+                    return False, None
+                self._i = 0
+            path = self.files[self._i]
+            self._i += 1
+            frame = cv2.imread(path)
+            if frame is None:
+                continue
+            if self.size and (frame.shape[1], frame.shape[0]) != tuple(self.size):
+                frame = cv2.resize(frame, tuple(self.size), dst=image)
+            elif image is not None and image.shape == frame.shape:
+                np.copyto(image, frame)
+                frame = image
+            self._pacer.wait()
+            return True, frame
+        return False, None
+
+    def release(self):
+        self._open = False
+
+
+class SyntheticSource:
+    """
+    절차적으로 만든 프레임: 배경 그라데이션 위에 얼굴 n개가 천천히 움직인다.
+    face_dir가 주어지면 그 폴더의 실제 얼굴 사진을 붙여서 HOG 검출이 실제로 걸리게 하고,
+    없으면 타원/눈/입으로 그린 얼굴을 쓴다(검출보다는 렌더/인코딩 부하 측정용).
+    """
+    def __init__(self, width=640, height=480, faces=1, fps=0, seed=0, face_dir=None, face_size=None):
+        self.w, self.h = int(width), int(height)
+        self.n = int(faces)
+        self.rng = np.random.default_rng(seed)
+        self.face_size = int(face_size or min(self.w, self.h) // 4)
+        self._pacer = _Pacer(fps)
+        self._t = 0
+        self._open = True
+        self.last_boxes = []   # 마지막 프레임의 얼굴 위치(정답) (top, right, bottom, left)
+
+        yy = np.linspace(60, 140, self.h, dtype=np.float32)[:, None, None]
+        xx = np.linspace(0, 40, self.w, dtype=np.float32)[None, :, None]
+        self._bg = np.clip(yy + xx + np.array([10, 0, -10], dtype=np.float32), 0, 255).astype(np.uint8)
+
+        self._sprites = []
+        if face_dir:
+            for f in sorted(glob.glob(os.path.join(face_dir, "*"))):
+                img = cv2.imread(f) if f.lower().endswith(IMAGE_EXTS) else None
+                if img is not None:
+                    self._sprites.append(cv2.resize(img, (self.face_size, self.face_size)))
+
+        s = self.face_size
+        self._pos = self.rng.uniform([0, 0], [max(1, self.w - s), max(1, self.h - s)], size=(self.n, 2))
+        self._vel = self.rng.uniform(-3, 3, size=(self.n, 2))
+
+    def isOpened(self):
+        return self._open
+
+    def _draw_face(self, frame, x, y, k):
+        s = self.face_size
+        if self._sprites:
+            frame[y:y + s, x:x + s] = self._sprites[k % len(self._sprites)]
+            return
+        cx, cy = x + s // 2, y + s // 2
+        cv2.ellipse(frame, (cx, cy), (s * 2 // 5, s // 2), 0, 0, 360, (140, 170, 220), -1)
+        for ex in (cx - s // 6, cx + s // 6):
+            cv2.circle(frame, (ex, cy - s // 8), max(2, s // 16), (40, 40, 40), -1)
+        smile = (self._t // 30 + k) % 2  # 주기적으로 표정 변화
+        cv2.ellipse(frame, (cx, cy + s // 5), (s // 6, s // 12 if smile else 2), 0, 0, 180, (60, 60, 150), 2)
+
+    def read(self, image=None):
+        if not self._open:
+            return False, None
+        self._pacer.wait()
+        if image is not None and image.shape == self._bg.shape:
+            np.copyto(image, self._bg)
+            frame = image
+        else:
+            frame = self._bg.copy()
+        s = self.face_size
+        lim = np.array([max(1, self.w - s), max(1, self.h - s)])
+        self.last_boxes = []
+        for k in range(self.n):
+            self._pos[k] += self._vel[k]
+            bounce = (self._pos[k] < 0) | (self._pos[k] > lim)
+            self._vel[k][bounce] *= -1
+            self._pos[k] = np.clip(self._pos[k], 0, lim)
+            x, y = int(self._pos[k][0]), int(self._pos[k][1])
+            self._draw_face(frame, x, y, k)
+            self.last_boxes.append((y, min(self.w, x + s), min(self.h, y + s), x))
+        self._t += 1
+        return True, frame
+
+    def release(self):
+        self._open = False
+
+
+def _parse_size(v, default=(640, 480)):
+    if not v:
+        return default
+    w, h = v.lower().split("x")
+    return int(w), int(h)
+
+def open_source(spec="0", **opts):
+    """
+    소스 지정 문자열 → 캡처 객체
+      "0", "1"                  : 웹캠 번호
+      "synthetic:640x480:2"     : 합성 프레임 (크기, 얼굴 수), opts: fps, seed, face_dir
+      "<폴더 경로>"              : 이미지 폴더, opts: fps, loop, size
+      "<파일 경로>"              : 동영상 파일, opts: fps(실시간 재생), loop
+    """
+    spec = str(spec).strip()
+    if spec.isdigit():
+        return cv2.VideoCapture(int(spec))
+    if spec.startswith("synthetic"):
+        parts = spec.split(":")
+        w, h = _parse_size(parts[1] if len(parts) > 1 else None)
+        faces = int(parts[2]) if len(parts) > 2 and parts[2] else 1
+        return SyntheticSource(w, h, faces, **opts)
+    if os.path.isdir(spec):
+        return ImageDirSource(spec, **opts)
+    return VideoFileSource(spec, **opts)
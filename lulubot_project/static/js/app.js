@@ -3,8 +3,9 @@ import ChatController from './core/chat.js';
 import UIController from './core/ui.js';
 import StatusController from './core/status.js';
 import UserController from './core/user.js';
+import EventStream from './core/events.js';
 
-let camera, chat, ui, status, user;
+let camera, chat, ui, status, user, events;
 
 const $ = (id) => document.getElementById(id);
 const cacheBust = () => `cb=${Date.now()}`;
@@ -77,6 +78,7 @@ async function registerUserFlow() {
 document.addEventListener('DOMContentLoaded', () => {
   // --- 컨트롤러 생성 ---
   ui = new UIController();
+  events = new EventStream(); // 모든 컨트롤러가 공유하는 /api/events 연결 1개
 
   camera = new CameraController({
     // 주의: index.html에서는 <img id="videoFeed"> 이므로 core/camera.js가 MJPEG <img>를 지원하도록 되어 있어야 함
@@ -85,6 +87,7 @@ document.addEventListener('DOMContentLoaded', () => {
     stopBtn: $('stopBtn'),
     registerBtn: $('registerBtn'),
     ui,
+    events,
   });
 
   chat = new ChatController({
@@ -105,9 +108,11 @@ document.addEventListener('DOMContentLoaded', () => {
   status = new StatusController({
     ui,
     chat,
+    events,
   });
 
   // --- 모듈 init ---
+  events.init();
   camera.init();
   chat.init();
   user.init();
@@ -126,15 +131,10 @@ document.addEventListener('DOMContentLoaded', () => {
     if (e.key === 'Enter') registerUserFlow();
   });
 
-  // --- (선택) 카메라 상태 폴링해 우측 상단 상태 갱신 ---
-  setInterval(async () => {
-    try {
-      const res = await fetch(`/api/camera_status?${cacheBust()}`);
-      if (!res.ok) return;
-      const j = await res.json();
-      if (j.status === 'started') {
-        ui?.updateStatus?.('active', '스트리밍 중');
-      }
-    } catch {}
-  }, 5000);
+  // --- (선택) 카메라 상태 push 받아 우측 상단 상태 갱신 ---
+  events.subscribe((state, delta) => {
+    if ('camera' in delta && state.camera === 'started') {
+      ui?.updateStatus?.('active', '스트리밍 중');
+    }
+  });
 });
@@ -2,12 +2,13 @@
 const API = "" // Flask 서버 포트 맞추기
 
 export default class CameraController {
-  constructor({ video, startBtn, stopBtn, registerBtn, ui }) {
+  constructor({ video, startBtn, stopBtn, registerBtn, ui, events }) {
     this.el = video; // <img id="videoFeed">
     this.startBtn = startBtn;
     this.stopBtn = stopBtn;
     this.registerBtn = registerBtn;
     this.ui = ui;
+    this.events = events; // EventStream(/api/events 구독)
 
     this.isStreaming = false;
     this._reconnect = null;
@@ -53,6 +54,9 @@ export default class CameraController {
 
         this._setButtons(true);
         this.ui?.updateStatus?.("active", "카메라 실행 중");
+      } else if (response.status === 503) {
+        // 서버가 모델/갤러리를 아직 올리는 중 (/readyz)
+        this.ui?.updateStatus?.("error", "서버 준비 중 — 잠시 후 다시 시도하세요");
       } else {
         this.ui?.updateStatus?.("error", "카메라 시작 실패");
       }
@@ -98,20 +102,15 @@ export default class CameraController {
   }
 
   _startHealth() {
+    // 5초 폴링 대신 상태 push 구독: 카메라가 멈췄다고 알려오면 재연결 시도
     this._stopHealth();
-    this._health = setInterval(async () => {
-      if (!this.isStreaming) return;
-      try {
-        const r = await fetch(`${API}/api/camera_status?${this._cb()}`); // <<<<<< API 붙임
-        const j = await r.json();
-        if (j.status !== "started") this._scheduleReconnect();
-      } catch {
-        this._scheduleReconnect();
-      }
-    }, 5000);
+    this._health = this.events.subscribe((state, delta) => {
+      if (!this.isStreaming || !("camera" in delta)) return;
+      if (state.camera !== "started") this._scheduleReconnect();
+    });
   }
   _stopHealth() {
-    if (this._health) clearInterval(this._health);
+    if (this._health) this._health();
     this._health = null;
   }
 
@@ -0,0 +1,48 @@
+// 📁 static/js/core/events.js
+// /api/events(SSE) 구독: 서버가 tick 변경 시에만 보내는 변경분을 합쳐서 전체 상태로 유지
+const API = "";
+
+export default class EventStream {
+  constructor() {
+    this.state = {};
+    this.listeners = new Set();
+    this.es = null;
+    this._poll = null;
+  }
+
+  init() {
+    if (!window.EventSource) {
+      this._startPolling(); // 구형 브라우저: ETag 폴링으로 대체
+      return;
+    }
+    this.es = new EventSource(`${API}/api/events`);
+    this.es.onmessage = (e) => {
+      try { this._apply(JSON.parse(e.data)); } catch {}
+    };
+    // 연결이 끊기면 EventSource가 자동 재연결, 첫 메시지로 전체 상태를 다시 받음
+  }
+
+  subscribe(fn) {
+    this.listeners.add(fn);
+    if (Object.keys(this.state).length) fn(this.state, this.state);
+    return () => this.listeners.delete(fn);
+  }
+
+  _apply(delta) {
+    Object.assign(this.state, delta);
+    this.listeners.forEach((fn) => {
+      try { fn(this.state, delta); } catch (err) { console.error(err); }
+    });
+  }
+
+  _startPolling() {
+    this._poll = setInterval(async () => {
+      try {
+        const res = await fetch(`${API}/api/status`, { cache: 'no-cache' }); // 304면 브라우저 캐시 재사용
+        if (!res.ok) return;
+        const j = await res.json();
+        if (j.tick !== this.state.tick) this._apply(j);
+      } catch {}
+    }, 1000);
+  }
+}
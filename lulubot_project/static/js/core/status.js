@@ -2,10 +2,11 @@
 const API = "http://127.0.0.1:5001";
 
 export default class StatusController {
-  constructor({ ui, chat }) {
+  constructor({ ui, chat, events }) {
     this.ui = ui;
     this.chat = chat;
-    this.interval = null;
+    this.events = events; // EventStream(/api/events 구독)
+    this.unsubscribe = null;
     this.currentUserNameElem = document.getElementById('currentUser');
     this.currentEmotionElem = document.getElementById('currentEmotion');
     this.confidenceFillElem = document.getElementById('confidenceFill');
@@ -15,45 +16,32 @@ export default class StatusController {
   }
 
   init() {
-    this.interval = setInterval(() => this.updateStatus(), 1000);
-  }
-
-  async updateStatus() {
-    try {
-      const res = await fetch(`${API}/api/current_status`); // <<<<<< API 붙임
-      if (!res.ok) return;
-      const data = await res.json();
-
-      // app.py 기준: { camera, known_count }만 존재
-      const camOn = data.camera === 'started';
+    // 매초 폴링 대신 서버 push로 갱신
+    this.unsubscribe = this.events.subscribe((state) => this.updateStatus(state));
 
-      // 사용자/감정 정보는 아직 없으므로 기본 텍스트 유지
-      this.currentUserNameElem.textContent = camOn ? '사용자 인식 대기중' : '카메라 꺼짐';
+    // 아직 백엔드 없음 → 시작 시 한 번만 시도, 실패해도 콘솔만
+    this.loadPersonality().catch(()=>{});
+    this.loadEmotionHistory().catch(()=>{});
+  }
 
-      // 채팅 입력 활성/비활성(카메라 켜짐 기준)
-      if (this.chat) {
-        this.chat.input.disabled = !camOn;
-        this.chat.sendBtn.disabled = !camOn;
-      }
+  updateStatus(data) {
+    const camOn = data.camera === 'started';
 
-      // 아래는 추후 백엔드가 emotion/user 필드를 주면 활성화
-      if (data.emotion) {
-        this.currentEmotionElem.textContent = data.emotion_korean || data.emotion;
-        this.confidenceFillElem.style.width = `${(data.confidence || 0) * 100}%`;
-        if (data.emotion_image) this.emotionImage.src = data.emotion_image;
-      }
+    // 사용자 이름(첫 얼굴 기준)
+    const who = (data.names || [])[0];
+    this.currentUserNameElem.textContent = !camOn ? '카메라 꺼짐'
+      : (who && who !== 'Unknown') ? who : '사용자 인식 대기중';
 
-      if (data.behavior) {
-        const avatar = document.getElementById('lurubotAvatar');
-        avatar.classList.add(data.behavior);
-        setTimeout(() => avatar.classList.remove(data.behavior), 1000);
-      }
+    // 채팅 입력 활성/비활성(카메라 켜짐 기준)
+    if (this.chat) {
+      this.chat.input.disabled = !camOn;
+      this.chat.sendBtn.disabled = !camOn;
+    }
 
-      // 아직 백엔드 없음 → 실패해도 콘솔만
-      this.loadPersonality().catch(()=>{});
-      this.loadEmotionHistory().catch(()=>{});
-    } catch (err) {
-      console.error('상태 업데이트 실패:', err);
+    if (data.emotion) {
+      this.currentEmotionElem.textContent = data.emotion;
+      this.confidenceFillElem.style.width = `${(data.conf || 0) * 100}%`;
+      this.emotionImage.src = `/static/images/emotions/${data.emotion}.png`;
     }
   }
 
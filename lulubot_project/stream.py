@@ -0,0 +1,94 @@
+# stream.py — MJPEG 한 번 인코딩 → 여러 클라이언트로 공유 송출
+import threading
+import cv2
+
+import metrics
+
+# 렌디션: 이름 -> {width: 출력 가로(None이면 원본), quality: JPEG 품질}
+DEFAULT_RENDITIONS = {
+    "main": {"width": None, "quality": 80},
+    "thumb": {"width": 320, "quality": 60},  # 대시보드용 썸네일
+}
+
+
+class _Rendition:
+    def __init__(self, width, quality):
+        self.width = width
+        self.quality = quality
+        self.lock = threading.Lock()
+        self.seq = -1       # 캐시된 part가 어느 프레임 것인지
+        self.part = None    # multipart 조각(헤더 포함) bytes
+
+
+class StreamBroadcaster:
+    """
+    새 프레임은 publish()로 한 번만 등록되고, 렌디션별 JPEG 인코딩은
+    해당 프레임을 처음 요청한 클라이언트가 한 번만 수행해 나머지가 공유한다.
+    클라이언트는 자기가 본 seq보다 새로운 프레임이 생길 때까지 condition에서 대기하며,
+    느린 클라이언트는 중간 프레임을 큐에 쌓지 않고 건너뛴다(최신 프레임만 받음).
+    publish()에 FrameRing의 Frame을 넘기면 참조 하나를 가져가서 다음 프레임이 올 때 반납하고,
+    인코딩하는 동안에는 따로 참조를 잡아 버퍼가 재사용되지 않게 한다.
+    """
+    def __init__(self, renditions=None):
+        self._cv = threading.Condition()
+        self._frame = None
+        self.seq = 0
+        self._closed = False
+        self.renditions = {name: _Rendition(**cfg)
+                           for name, cfg in (renditions or DEFAULT_RENDITIONS).items()}
+
+    def publish(self, frame):
+        with self._cv:
+            prev, self._frame = self._frame, frame
+            self.seq += 1
+            self._closed = False
+            self._cv.notify_all()
+        if hasattr(prev, "release"):
+            prev.release()
+
+    def close(self):
+        """대기 중인 클라이언트를 깨워서 종료시키기"""
+        with self._cv:
+            prev, self._frame = self._frame, None
+            self._closed = True
+            self._cv.notify_all()
+        if hasattr(prev, "release"):
+            prev.release()
+
+    def wait(self, rendition="main", after_seq=0, timeout=1.0):
+        """
+        after_seq보다 새로운 프레임의 (seq, part) 반환.
+        timeout 내에 새 프레임이 없거나 종료되었으면 (after_seq, None)
+        """
+        r = self.renditions.get(rendition) or self.renditions["main"]
+        with self._cv:
+            ok = self._cv.wait_for(lambda: self._closed or (self._frame is not None and self.seq > after_seq), timeout)
+            if not ok or self._closed:
+                return after_seq, None
+            seq, frame = self.seq, self._frame
+            held = hasattr(frame, "retain")
+            if held:
+                frame.retain()
+        try:
+            return self._encode(r, seq, frame.data if held else frame)
+        finally:
+            if held:
+                frame.release()
+
+    def _encode(self, r, seq, frame):
+        with r.lock:
+            if r.seq >= seq:       # 다른 클라이언트가 이미 인코딩함
+                return r.seq, r.part
+            with metrics.stage("jpeg"):
+                img = frame
+                if r.width and frame.shape[1] > r.width:
+                    h = int(frame.shape[0] * r.width / frame.shape[1])
+                    img = cv2.resize(frame, (r.width, h), interpolation=cv2.INTER_AREA)
+                ok, jpg = cv2.imencode(".jpg", img, [int(cv2.IMWRITE_JPEG_QUALITY), r.quality])
+            if not ok:
+                return seq, None   # 이 프레임은 건너뜀
+            data = jpg.tobytes()
+            r.part = (b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: "
+                      + str(len(data)).encode() + b"\r\n\r\n" + data + b"\r\n")
+            r.seq = seq
+            return r.seq, r.part
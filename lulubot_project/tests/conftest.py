@@ -0,0 +1,4 @@
+# 모듈들이 lulubot_project/ 바로 아래에 평평하게 있으므로(app.py와 같은 방식) 그 경로를 import 경로에 추가
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,39 @@
+# 일괄 등록 zip 라벨링 회귀 테스트
+import io, zipfile
+
+from enroll import list_zip, list_dir
+
+
+def _zip(names):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for n in names:
+            zf.writestr(n, b"x")
+    return zipfile.ZipFile(buf)
+
+
+def test_zipped_person_folder_uses_folder_name():
+    got = list_zip(_zip(["alice/IMG_0001.jpg", "alice/IMG_0002.jpg"]))
+    assert [label for label, _ in got] == ["alice", "alice"]
+    assert list_zip(_zip(["bob/DSC01234.jpg"]))[0][0] == "bob"
+    assert list_zip(_zip(["carol/1.jpg", "carol/2.jpg"]))[0][0] == "carol"
+
+
+def test_zipped_flat_folder_uses_file_names():
+    got = list_zip(_zip(["staff/alice_1.jpg", "staff/alice_2.jpg", "staff/bob_1.jpg"]))
+    assert got == [("alice", "staff/alice_1.jpg"), ("alice", "staff/alice_2.jpg"), ("bob", "staff/bob_1.jpg")]
+
+
+def test_zip_with_person_subfolders_and_root_files():
+    got = dict((n, label) for label, n in list_zip(_zip([
+        "roster/alice/a.jpg", "roster/bob/b.png", "__MACOSX/roster/._a.jpg", "roster/notes.txt"])))
+    assert got == {"roster/alice/a.jpg": "alice", "roster/bob/b.png": "bob"}
+    got = dict((n, label) for label, n in list_zip(_zip(["alice_1.jpg", "bob (2).jpg", "carol/x.jpg"])))
+    assert got == {"alice_1.jpg": "alice", "bob (2).jpg": "bob", "carol/x.jpg": "carol"}
+
+
+def test_list_dir_labels(tmp_path):
+    (tmp_path / "alice").mkdir()
+    (tmp_path / "alice" / "IMG_0001.jpg").write_bytes(b"x")
+    (tmp_path / "bob_3.jpg").write_bytes(b"x")
+    assert sorted(label for label, _ in list_dir(str(tmp_path))) == ["alice", "bob"]
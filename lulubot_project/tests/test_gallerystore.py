@@ -0,0 +1,167 @@
+# 갤러리 저장소(변경 로그 + 스냅샷) 복구/압축 회귀 테스트
+import os, pickle
+import numpy as np
+import pytest
+
+import gallerystore
+from gallerystore import GalleryStore
+
+
+def _enc(seed):
+    return np.random.default_rng(seed).normal(0.0, 0.09, 128).astype(np.float32)
+
+def _state(g):
+    names, encs, _ = g.snapshot()
+    return {n: e.copy() for n, e in zip(names, encs)}
+
+def _assert_same(a, b):
+    assert set(a) == set(b)
+    for n in a:
+        np.testing.assert_array_equal(a[n], b[n])
+
+
+def test_log_roundtrip(tmp_path):
+    store = GalleryStore(str(tmp_path))
+    g = store.load(mode="flat")
+    g.add("alice", _enc(1))
+    g.add("bob", _enc(2))
+    g.add("alice", _enc(3))      # update
+    g.add("carol", _enc(4))
+    g.remove("bob")
+    expected = _state(g)
+    store.sync()
+    store.close()
+
+    g2 = GalleryStore(str(tmp_path)).load(mode="flat")
+    _assert_same(_state(g2), expected)
+    assert g2.match([_enc(3)], 0.5)[0][0] == "alice"
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    store = GalleryStore(str(tmp_path))
+    g = store.load(mode="flat")
+    g.add("alice", _enc(1))
+    g.add("bob", _enc(2))
+    store.close()
+    log = tmp_path / "log-0.bin"
+    good = log.stat().st_size
+    with open(log, "ab") as f:          # 기록 도중 죽은 것처럼 레코드 앞부분만
+        f.write(b"\x84\x02\x00\x00\x11\x22")
+
+    store = GalleryStore(str(tmp_path))
+    g = store.load(mode="flat")
+    assert sorted(g.names) == ["alice", "bob"]
+    assert log.stat().st_size == good
+    g.add("carol", _enc(3))             # 잘라낸 뒤 이어 쓴 레코드도 읽혀야 함
+    store.close()
+    assert sorted(GalleryStore(str(tmp_path)).load(mode="flat").names) == ["alice", "bob", "carol"]
+
+
+def test_crc_mismatch_stops_replay(tmp_path):
+    store = GalleryStore(str(tmp_path))
+    g = store.load(mode="flat")
+    g.add("alice", _enc(1))
+    store._log.flush()
+    first = (tmp_path / "log-0.bin").stat().st_size
+    g.add("bob", _enc(2))
+    store.close()
+    data = bytearray((tmp_path / "log-0.bin").read_bytes())
+    data[-1] ^= 0xFF                    # 두 번째 레코드 본문 손상
+    (tmp_path / "log-0.bin").write_bytes(bytes(data))
+
+    g = GalleryStore(str(tmp_path)).load(mode="flat")
+    assert g.names == ["alice"]
+    assert (tmp_path / "log-0.bin").stat().st_size == first
+
+
+def test_readonly_load_leaves_files_alone(tmp_path):
+    store = GalleryStore(str(tmp_path))
+    store.load(mode="flat").add("alice", _enc(1))
+    store.close()
+    with open(tmp_path / "log-0.bin", "ab") as f:
+        f.write(b"\x01\x02")
+    size = (tmp_path / "log-0.bin").stat().st_size
+
+    g = GalleryStore(str(tmp_path)).load(readonly=True, mode="flat")
+    assert g.names == ["alice"]
+    assert (tmp_path / "log-0.bin").stat().st_size == size
+
+
+def test_compact_rotates_log_and_keeps_concurrent_changes(tmp_path, monkeypatch):
+    store = GalleryStore(str(tmp_path))
+    g = store.load(mode="flat")
+    for i in range(20):
+        g.add(f"p{i}", _enc(i))
+    g.remove("p3")
+
+    write = store._write_snapshot
+    def write_while_changing(*args):
+        g.add("late", _enc(100))        # 스냅샷을 쓰는 동안 들어온 변경 → 새 세대 로그로
+        g.remove("p5")
+        write(*args)
+    monkeypatch.setattr(store, "_write_snapshot", write_while_changing)
+    store.compact()
+    expected = _state(g)
+    store.close()
+
+    assert (tmp_path / "CURRENT").read_text() == "1"
+    assert not (tmp_path / "log-0.bin").exists()
+    assert (tmp_path / "log-1.bin").exists()
+    g2 = GalleryStore(str(tmp_path)).load(mode="flat")
+    _assert_same(_state(g2), expected)
+    assert "late" in g2.names and "p5" not in g2.names
+
+
+def test_crash_before_current_switch_replays_both_logs(tmp_path, monkeypatch):
+    store = GalleryStore(str(tmp_path))
+    g = store.load(mode="flat")
+    g.add("alice", _enc(1))
+
+    def crash(*args):
+        g.add("bob", _enc(2))           # 새 로그(log-1)에만 기록됨
+        raise OSError("disk full")
+    monkeypatch.setattr(store, "_write_snapshot", crash)
+    with pytest.raises(OSError):
+        store.compact()
+    store.close()
+
+    assert not (tmp_path / "CURRENT").exists()
+    g2 = GalleryStore(str(tmp_path)).load(mode="flat")
+    assert sorted(g2.names) == ["alice", "bob"]
+
+
+def test_snapshot_spare_rows_keep_replayed_enrolls_mapped(tmp_path):
+    store = GalleryStore(str(tmp_path))
+    g = store.load(mode="flat")
+    for i in range(50):
+        g.add(f"p{i}", _enc(i))
+    store.compact()
+    g.add("new", _enc(99))              # 스냅샷 이후 로그에만 있는 등록
+    store.close()
+
+    g2 = GalleryStore(str(tmp_path)).load(mode="flat")
+    assert isinstance(g2._encs, np.memmap)
+    assert g2._encs.shape[0] == 50 + gallerystore.spare_rows(50)
+    assert len(g2) == 51 and g2.match([_enc(99)], 0.5)[0][0] == "new"
+
+
+def test_import_pickle(tmp_path):
+    pkl = tmp_path / "faces_db.pkl"
+    records = [{"name": "alice", "encoding": _enc(1).astype(np.float64)},
+               {"name": "bob", "encoding": _enc(2).astype(np.float64)}]
+    with open(pkl, "wb") as f:
+        pickle.dump(records, f)
+
+    store = GalleryStore(str(tmp_path / "gallery"))
+    assert not store.exists()
+    g = store.import_pickle(str(pkl), mode="flat")
+    assert sorted(g.names) == ["alice", "bob"]
+    g.add("carol", _enc(3))
+    store.close()
+
+    store = GalleryStore(str(tmp_path / "gallery"))
+    assert store.exists()
+    g2 = store.load(mode="flat")
+    assert sorted(g2.names) == ["alice", "bob", "carol"]
+    np.testing.assert_allclose(_state(g2)["alice"], _enc(1), rtol=1e-6)
+    assert os.path.exists(pkl)          # 원본 pickle은 그대로 둠
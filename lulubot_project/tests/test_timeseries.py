@@ -0,0 +1,75 @@
+# 감정 시계열 링 버퍼(EmotionStore) 회귀 테스트
+import numpy as np
+
+from emotions import EMOTIONS
+from timeseries import EmotionStore
+
+
+def _probs(label):
+    return {k: (1.0 if k == label else 0.0) for k in EMOTIONS}
+
+
+def test_append_rows_and_reopen(tmp_path):
+    path = str(tmp_path / "hist.bin")
+    st = EmotionStore(path, capacity=16)
+    st.append(1000, _probs("happy"), "alice", 1)
+    st.append(2000, _probs("sad"), None, 2)
+    st.flush()
+    del st
+
+    st = EmotionStore(path, capacity=999)    # 기존 파일의 용량을 그대로 씀
+    assert st.capacity == 16 and st.count == 2
+    rows = st.rows()
+    assert [r["t"] for r in rows] == [1000, 2000]
+    assert rows[0]["name"] == "alice" and rows[0]["probs"]["happy"] == 1.0
+    assert rows[1]["name"] == "Unknown" and rows[1]["track"] == 2
+
+
+def test_wraparound_keeps_latest_rows_in_time_order(tmp_path):
+    st = EmotionStore(str(tmp_path / "hist.bin"), capacity=8)
+    for i in range(21):
+        st.append(i * 100, _probs("neutral"), None, i)
+    assert st.count == 21 and len(st) == 8
+    assert [r["t"] for r in st.rows(limit=100)] == [i * 100 for i in range(13, 21)]
+    assert [r["t"] for r in st.rows(limit=3)] == [1800, 1900, 2000]
+    assert st.rows(limit=0) == [] and st.rows(limit=-1) == []
+
+
+def test_range_query_across_wrap_boundary(tmp_path):
+    st = EmotionStore(str(tmp_path / "hist.bin"), capacity=8)
+    for i in range(13):                      # 물리 행 5에서 논리 순서가 이어짐
+        st.append(i * 100, _probs("neutral"), None, i)
+    got = [r["t"] for r in st.rows(t_from=650, t_to=1050, limit=100)]
+    assert got == [700, 800, 900, 1000]
+    assert st.rows(t_from=5000) == []
+    assert st.rows(t_to=100) == []           # 100 이하 행은 이미 덮어씀
+
+
+def test_name_filter(tmp_path):
+    st = EmotionStore(str(tmp_path / "hist.bin"), capacity=16)
+    for i, name in enumerate(["alice", "bob", "alice", None]):
+        st.append(i, _probs("happy"), name, i)
+    assert [r["t"] for r in st.rows(name="alice")] == [0, 2]
+    assert st.rows(name="nobody") == []
+
+
+def test_buckets_mean_max_label(tmp_path):
+    st = EmotionStore(str(tmp_path / "hist.bin"), capacity=64)
+    st.append(0, _probs("happy"))
+    st.append(400, _probs("happy"))
+    st.append(900, _probs("sad"))
+    st.append(1500, _probs("angry"))
+    b = st.buckets(0, 2000, 1000)
+    assert [x["t"] for x in b] == [0, 1000]
+    assert [x["n"] for x in b] == [3, 1]
+    assert b[0]["label"] == "happy"
+    assert np.isclose(b[0]["mean"]["happy"], 2 / 3, atol=1e-4) and b[0]["max"]["sad"] == 1.0
+    assert b[1]["label"] == "angry"
+
+
+def test_corrupt_header_is_moved_aside(tmp_path):
+    path = tmp_path / "hist.bin"
+    path.write_bytes(b"not a store" * 10)
+    st = EmotionStore(str(path), capacity=8)
+    assert st.count == 0
+    assert (tmp_path / "hist.bin.bad").exists()
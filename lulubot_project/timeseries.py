@@ -0,0 +1,158 @@
+# timeseries.py — 감정 시계열 저장소 (메모리 맵 파일 위 컬럼형 링 버퍼)
+import os, json, threading
+import numpy as np
+
+from emotions import EMOTIONS
+
+MAGIC = 0x4C554C55454D4F31   # "LULUEMO1"
+VERSION = 1
+HDR_BYTES = 64
+DEFAULT_CAPACITY = 262144    # 행당 44B → 약 11.5MB, 초당 30행(얼굴 1명, 매 프레임 검출) 기준 약 2.4시간
+
+
+class EmotionStore:
+    """
+    한 파일에 컬럼별로 고정 배치한 링 버퍼:
+      header int64[8] (magic, version, capacity, count) | ts int64[N] | ident int32[N] | track int32[N] | probs float32[N,7]
+    count는 누적 기록 수(단조 증가)이고 행은 count % N 위치에 덮어쓴다.
+    행을 먼저 쓰고 count를 마지막에 올리므로 중간에 죽어도 완성된 행만 보인다.
+    ident는 이름 테이블(<path>.names.json)의 번호, -1이면 Unknown.
+    """
+    def __init__(self, path, capacity=DEFAULT_CAPACITY):
+        self.path = path
+        self._lock = threading.Lock()
+        self._open(capacity)
+        self._names_path = path + ".names.json"
+        self._names = []
+        if os.path.exists(self._names_path):
+            try:
+                with open(self._names_path, "r", encoding="utf-8") as f:
+                    self._names = json.load(f)
+            except Exception:
+                self._names = []
+        self._name_ids = {n: i for i, n in enumerate(self._names)}
+
+    @staticmethod
+    def _size(cap):
+        return HDR_BYTES + cap * (8 + 4 + 4 + 28)
+
+    def _open(self, capacity):
+        cap = -(-int(capacity) // 8) * 8   # 8의 배수로 맞춰 컬럼 정렬 유지
+        if os.path.exists(self.path):
+            hdr = np.fromfile(self.path, dtype=np.int64, count=4)
+            if (len(hdr) == 4 and hdr[0] == MAGIC and hdr[1] == VERSION
+                    and os.path.getsize(self.path) == self._size(int(hdr[2]))):
+                cap = int(hdr[2])
+            else:  # 알 수 없는 포맷/손상 → 옆으로 치우고 새로 만듦
+                os.replace(self.path, self.path + ".bad")
+        if not os.path.exists(self.path):
+            mm = np.memmap(self.path, dtype=np.uint8, mode="w+", shape=(self._size(cap),))
+            mm[:HDR_BYTES].view(np.int64)[:4] = (MAGIC, VERSION, cap, 0)
+            mm.flush()
+            del mm
+        self._mm = np.memmap(self.path, dtype=np.uint8, mode="r+")
+        off = HDR_BYTES
+        self._hdr = self._mm[:HDR_BYTES].view(np.int64)
+        self.ts = self._mm[off:off + cap * 8].view(np.int64); off += cap * 8
+        self.ident = self._mm[off:off + cap * 4].view(np.int32); off += cap * 4
+        self.track = self._mm[off:off + cap * 4].view(np.int32); off += cap * 4
+        self.probs = self._mm[off:off + cap * 28].view(np.float32).reshape(cap, 7)
+        self.capacity = cap
+
+    @property
+    def count(self):
+        return int(self._hdr[3])
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    # ---------- 기록 ----------
+    def _name_id(self, name):
+        if not name or name == "Unknown":
+            return -1
+        i = self._name_ids.get(name)
+        if i is None:
+            i = len(self._names)
+            self._names.append(name)
+            self._name_ids[name] = i
+            tmp = self._names_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._names, f, ensure_ascii=False)
+            os.replace(tmp, self._names_path)
+        return i
+
+    def append(self, t_ms, probs, name=None, track_id=-1):
+        """probs: dict(7) 또는 EMOTIONS 순서 배열"""
+        if isinstance(probs, dict):
+            probs = [probs.get(k, 0.0) for k in EMOTIONS]
+        with self._lock:
+            n = self.count
+            i = n % self.capacity
+            self.ts[i] = t_ms
+            self.ident[i] = self._name_id(name)
+            self.track[i] = track_id
+            self.probs[i] = probs
+            self._hdr[3] = n + 1
+
+    def flush(self):
+        self._mm.flush()
+
+    # ---------- 조회 ----------
+    def _segments(self):
+        """논리(시간) 순서의 물리 구간 [(a, b)]"""
+        n, cap = self.count, self.capacity
+        if n <= cap:
+            return [(0, n)]
+        h = n % cap
+        return [(h, cap), (0, h)] if h else [(0, cap)]
+
+    def _select(self, t_from=None, t_to=None, name=None):
+        """범위 내 행의 물리 인덱스(시간 순) — 구간별 이진 탐색이라 전체 복사가 없음"""
+        with self._lock:
+            parts = []
+            for a, b in self._segments():
+                ts = self.ts[a:b]
+                lo = a + (np.searchsorted(ts, t_from, "left") if t_from is not None else 0)
+                hi = a + (np.searchsorted(ts, t_to, "right") if t_to is not None else b - a)
+                if hi > lo:
+                    parts.append(np.arange(lo, hi))
+            idx = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+            if name is not None and idx.size:
+                idx = idx[self.ident[idx] == self._name_ids.get(name, -2)]
+            return idx
+
+    def _name(self, i):
+        return self._names[i] if 0 <= i < len(self._names) else "Unknown"
+
+    def rows(self, t_from=None, t_to=None, name=None, limit=200):
+        """원본 행(최근 limit개) — [{t, probs, name, track}]"""
+        if limit <= 0:
+            return []
+        idx = self._select(t_from, t_to, name)[-limit:]
+        ts, ident, track, probs = self.ts[idx], self.ident[idx], self.track[idx], self.probs[idx]
+        return [{"t": int(t), "probs": dict(zip(EMOTIONS, np.round(p.astype(np.float64), 4).tolist())),
+                 "name": self._name(int(d)), "track": int(k)}
+                for t, d, k, p in zip(ts, ident, track, probs)]
+
+    def buckets(self, t_from, t_to, bucket_ms, name=None):
+        """
+        [t_from, t_to] 구간을 bucket_ms 단위로 서버에서 다운샘플링.
+        각 구간: {t, n, mean{7}, max{7}, label(평균 기준 우세 감정)}
+        """
+        idx = self._select(t_from, t_to, name)
+        if idx.size == 0:
+            return []
+        ts = self.ts[idx]
+        probs = self.probs[idx]
+        base = t_from if t_from is not None else int(ts[0])
+        bid = (ts - base) // int(bucket_ms)
+        starts = np.flatnonzero(np.r_[True, bid[1:] != bid[:-1]])  # ts가 정렬돼 있으므로 연속 구간
+        counts = np.diff(np.r_[starts, len(bid)])
+        means = np.add.reduceat(probs.astype(np.float64), starts, axis=0) / counts[:, None]
+        maxes = np.maximum.reduceat(probs, starts, axis=0).astype(np.float64)
+        tops = means.argmax(1)
+        return [{"t": int(base + bid[s] * bucket_ms), "n": int(c),
+                 "mean": dict(zip(EMOTIONS, np.round(m, 4).tolist())),
+                 "max": dict(zip(EMOTIONS, np.round(x, 4).tolist())),
+                 "label": EMOTIONS[int(k)]}
+                for s, c, m, x, k in zip(starts, counts, means, maxes, tops)]
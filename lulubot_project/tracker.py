@@ -0,0 +1,177 @@
+# tracker.py — 검출 프레임 사이 얼굴 추적 (IoU/중심점 연계 + 선택적 optical flow)
+import threading, time
+import numpy as np
+import cv2
+
+from emotions import EMOTIONS
+
+
+def iou(a, b):
+    """(top, right, bottom, left) 박스 두 개의 IoU"""
+    t, r = max(a[0], b[0]), min(a[1], b[1])
+    bt, l = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, r - l) * max(0, bt - t)
+    if inter == 0:
+        return 0.0
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    return inter / float(area_a + area_b - inter)
+
+
+def _center(b):
+    return (b[3] + b[1]) / 2.0, (b[0] + b[2]) / 2.0
+
+
+class Track:
+    def __init__(self, tid, box, now):
+        self.id = tid
+        self.box = tuple(box)
+        self.hits = 1
+        self.misses = 0
+        self.name = "Unknown"
+        self.encoded_at = 0.0        # 마지막으로 인코딩/매칭한 시각
+        self.gallery_version = -1    # 그때의 갤러리 버전(Unknown 판정 재사용 여부)
+        self.probs = None            # EMA로 평활화한 7클래스 확률
+        self.created = now
+
+    def bind(self, name, gallery_version, now):
+        self.name = name
+        self.gallery_version = gallery_version
+        self.encoded_at = now
+
+    def observe(self, probs, alpha):
+        if self.probs is None:
+            self.probs = dict(probs)
+        else:
+            self.probs = {k: (1 - alpha) * self.probs.get(k, 0.0) + alpha * probs.get(k, 0.0) for k in EMOTIONS}
+
+    @property
+    def label(self):
+        if not self.probs:
+            return None, 0.0
+        k = max(self.probs, key=self.probs.get)
+        return k, float(self.probs[k])
+
+
+class FaceTracker:
+    """
+    검출 결과(boxes)를 기존 트랙에 IoU → 중심점 거리 순으로 탐욕 연계하고,
+    검출이 없는 프레임에서는 박스/이름/평활 감정을 그대로 유지(또는 optical flow로 이동)한다.
+    이름이 확정된 트랙은 confident_boxes()로 알려서 인코딩/매칭을 건너뛰게 한다.
+    """
+    def __init__(self, iou_thresh=0.3, max_misses=2, alpha=0.5, reencode_sec=2.0, use_flow=False):
+        self.iou_thresh = iou_thresh
+        self.max_misses = max_misses
+        self.alpha = alpha
+        self.reencode_sec = reencode_sec
+        self.use_flow = use_flow
+        self.tracks = []
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._prev_gray = None
+
+    def reset(self):
+        with self._lock:
+            self.tracks = []
+            self._prev_gray = None
+
+    # ---------- 검출 프레임 ----------
+    def update(self, boxes, now=None):
+        """검출 박스 각각에 대응하는 Track 리스트 반환(새 얼굴은 새 트랙)"""
+        now = now or time.time()
+        with self._lock:
+            assigned = [None] * len(boxes)
+            free = set(range(len(self.tracks)))
+
+            # 1) IoU 탐욕 연계
+            pairs = sorted(((iou(t.box, b), ti, bi) for ti, t in enumerate(self.tracks)
+                            for bi, b in enumerate(boxes)), reverse=True)
+            for score, ti, bi in pairs:
+                if score < self.iou_thresh:
+                    break
+                if ti in free and assigned[bi] is None:
+                    assigned[bi] = ti
+                    free.discard(ti)
+
+            # 2) 남은 것은 중심점 거리(박스 크기 대비)로 연계
+            for bi, b in enumerate(boxes):
+                if assigned[bi] is not None:
+                    continue
+                cx, cy = _center(b)
+                best, best_d = None, 0.5
+                for ti in free:
+                    t = self.tracks[ti]
+                    tx, ty = _center(t.box)
+                    size = max(t.box[1] - t.box[3], t.box[2] - t.box[0], 1)
+                    d = np.hypot(cx - tx, cy - ty) / size
+                    if d < best_d:
+                        best, best_d = ti, d
+                if best is not None:
+                    assigned[bi] = best
+                    free.discard(best)
+
+            out = []
+            for bi, b in enumerate(boxes):
+                if assigned[bi] is None:
+                    t = Track(self._next_id, b, now)
+                    self._next_id += 1
+                    self.tracks.append(t)
+                else:
+                    t = self.tracks[assigned[bi]]
+                    t.box = tuple(b)
+                    t.hits += 1
+                    t.misses = 0
+                out.append(t)
+
+            for ti in free:
+                self.tracks[ti].misses += 1
+            self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+            return out
+
+    def confident_boxes(self, gallery_version, now=None):
+        """
+        인코딩을 생략해도 되는 트랙 박스:
+        2회 이상 연속 검출 + 최근 reencode_sec 이내 매칭 + (이름 확정 또는 갤러리 변화 없음)
+        """
+        now = now or time.time()
+        with self._lock:
+            return [t.box for t in self.tracks
+                    if t.hits >= 2 and t.misses == 0
+                    and now - t.encoded_at < self.reencode_sec
+                    and (t.name != "Unknown" or t.gallery_version == gallery_version)]
+
+    # ---------- 비검출 프레임 ----------
+    def propagate(self, frame):
+        """optical flow(LK)로 박스를 현재 프레임 위치로 이동 (use_flow=True일 때만)"""
+        if not self.use_flow:
+            return
+        small = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        with self._lock:
+            prev, self._prev_gray = self._prev_gray, gray
+            if prev is None or prev.shape != gray.shape:
+                return
+            for t in self.tracks:
+                top, right, bottom, left = (v // 2 for v in t.box)
+                mask = np.zeros_like(prev)
+                mask[max(0, top):bottom, max(0, left):right] = 255
+                pts = cv2.goodFeaturesToTrack(prev, maxCorners=20, qualityLevel=0.01, minDistance=4, mask=mask)
+                if pts is None:
+                    continue
+                nxt, st, _ = cv2.calcOpticalFlowPyrLK(prev, gray, pts, None, winSize=(15, 15), maxLevel=2)
+                good = st.reshape(-1) == 1
+                if not good.any():
+                    continue
+                dx, dy = np.median((nxt - pts).reshape(-1, 2)[good], axis=0) * 2
+                dx, dy = int(round(dx)), int(round(dy))
+                t.box = (t.box[0] + dy, t.box[1] + dx, t.box[2] + dy, t.box[3] + dx)
+
+    def boxes(self):
+        """살아있는 모든 트랙 박스 (ROI 제한 검색용)"""
+        with self._lock:
+            return [t.box for t in self.tracks]
+
+    def snapshot(self):
+        """렌더용: [(box, name, label, conf)]"""
+        with self._lock:
+            return [(t.box, t.name) + t.label for t in self.tracks]